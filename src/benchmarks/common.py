@@ -0,0 +1,72 @@
+import json
+import os
+import platform
+import subprocess
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+RESULTS_DIR = Path("benchmarks/results")
+
+
+def environment() -> dict:
+    """
+    Where and on what a result was measured, so runs can be compared.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=False
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def latency_summary(seconds: List[float]) -> dict:
+    """
+    Latency percentiles in milliseconds.
+    """
+    if not seconds:
+        return {}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p95": round(float(np.percentile(ms, 95)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "mean": round(float(ms.mean()), 3),
+        "max": round(float(ms.max()), 3)
+    }
+
+
+def timing_summary(seconds: List[float]) -> dict:
+    ms = np.asarray(seconds) * 1000
+    return {
+        "runs": len(seconds),
+        "min_ms": round(float(ms.min()), 3),
+        "median_ms": round(float(np.median(ms)), 3),
+        "max_ms": round(float(ms.max()), 3)
+    }
+
+
+def write_result(result: dict, output: Optional[Path], name: str) -> Path:
+    """
+    Write result as JSON to output, or to a timestamped file under
+    RESULTS_DIR, and return the path.
+    """
+    if output is None:
+        stamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        output = RESULTS_DIR / f"{name}_{stamp}.json"
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+    return output
@@ -0,0 +1,172 @@
+"""
+Time the drift and retraining-data paths as the prediction log grows and
+write the results as JSON.
+
+    python -m src.benchmarks.drift_bench --sizes 1000 10000 100000 1000000
+
+The log is generated from the reference sample in a scratch directory, so
+the real logs/ and data/retraining/ are never touched.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List
+from src.benchmarks.common import environment, timing_summary, write_result
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+GENERATE_CHUNK = 100_000
+REPEATS = 5
+WINDOW_SIZE = 100
+TREE_WINDOW = 200
+DETECT_ROWS = 1000
+RETRAIN_WINDOW = 200
+BENCHMARKS = [
+    "aggregate_drift",
+    "tree_based_drift",
+    "drift_detector",
+    "save_retraining_data"
+]
+# Paths under src/ that the benchmarked code reads relative to the cwd.
+SHARED_PATHS = ["src"]
+
+
+def prepare_workdir(repo_dir: Path, workdir: Path):
+    """
+    Scratch cwd for the run: links src/ (code and reference store) from the
+    repo and keeps everything the benchmarks write local to it.
+    """
+    workdir.mkdir(parents=True, exist_ok=True)
+    for name in SHARED_PATHS:
+        link = workdir / name
+        if not link.exists():
+            link.symlink_to(repo_dir / name)
+    os.chdir(workdir)
+
+
+def generate_rows(
+    sample: pd.DataFrame,
+    n: int,
+    start: datetime,
+    rng: np.random.Generator
+) -> pd.DataFrame:
+    """
+    n logged predictions resampled from the reference sample, one second
+    apart from start.
+    """
+    df = sample.iloc[rng.integers(0, len(sample), n)].reset_index(drop=True)
+    df.insert(0, "timestamp", pd.date_range(start, periods=n, freq="s"))
+    probability = rng.random(n)
+    df.insert(1, "prediction", (probability >= 0.5).astype(np.int8))
+    df.insert(2, "probability", probability)
+    return df
+
+
+def grow_log(sample: pd.DataFrame, current: int, target: int, rng) -> int:
+    from src.monitoring.store import append_frame
+
+    start = datetime(2024, 1, 1) + timedelta(seconds=current)
+    while current < target:
+        n = min(GENERATE_CHUNK, target - current)
+        append_frame(generate_rows(sample, n, start, rng))
+        start += timedelta(seconds=n)
+        current += n
+    return current
+
+
+def measure(fn: Callable, repeats: int, before: Callable = None) -> dict:
+    seconds = []
+    for _ in range(repeats):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - started)
+    return timing_summary(seconds)
+
+
+def run(sizes: List[int], repeats: int, benchmarks: List[str]) -> List[dict]:
+    from src.drift.analyzer import aggregate_drift
+    from src.drift.detector import DriftDetector
+    from src.drift import tree_drift
+    from src.monitoring.store import read_predictions
+    from src.retraining.trigger import save_retraining_data
+
+    sample = tree_drift.load_reference_data()
+    detector = DriftDetector(sample)
+    rng = np.random.default_rng(42)
+
+    cases = {
+        "aggregate_drift": (lambda: aggregate_drift(WINDOW_SIZE), None),
+        # Clear the result cache so every run fits the forest.
+        "tree_based_drift": (
+            lambda: tree_drift.tree_based_drift(TREE_WINDOW),
+            tree_drift._result_cache.clear
+        ),
+        "drift_detector": (
+            lambda: detector.detect(read_predictions(last_n=DETECT_ROWS)),
+            None
+        ),
+        "save_retraining_data": (
+            lambda: save_retraining_data(window_size=RETRAIN_WINDOW), None
+        )
+    }
+
+    results, rows = [], 0
+    for size in sorted(sizes):
+        started = time.perf_counter()
+        rows = grow_log(sample, rows, size, rng)
+        print(f"Log at {rows} rows ({time.perf_counter() - started:.1f}s to grow)")
+        timings = {}
+        for name in benchmarks:
+            fn, before = cases[name]
+            timings[name] = measure(fn, repeats, before)
+            print(f"  {name}: median {timings[name]['median_ms']} ms")
+        results.append({"rows": rows, "results": timings})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS)
+    parser.add_argument("--workdir", type=Path, help="kept after the run if given")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    repo_dir = Path.cwd().resolve()
+    output = args.output.resolve() if args.output else None
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="drift_bench_"))
+    benchmarks = args.only or BENCHMARKS
+
+    prepare_workdir(repo_dir, workdir.resolve())
+    try:
+        sizes = run(args.sizes, args.repeats, benchmarks)
+    finally:
+        os.chdir(repo_dir)
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "benchmark": "drift_micro",
+        "repeats": args.repeats,
+        "parameters": {
+            "window_size": WINDOW_SIZE,
+            "tree_window": TREE_WINDOW,
+            "detect_rows": DETECT_ROWS,
+            "retrain_window": RETRAIN_WINDOW
+        },
+        "sizes": sizes,
+        "environment": environment()
+    }
+    write_result(result, output, "drift_micro")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Replay prediction requests against the inference API and report latency
+percentiles and throughput as JSON.
+
+    python -m src.benchmarks.load_test --requests requests.jsonl --concurrency 8
+    python -m src.benchmarks.load_test --synthetic 2000 --rate 200 --url http://127.0.0.1:8000
+"""
+import argparse
+import json
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from src.benchmarks.common import environment, latency_summary, write_result
+from src.data.loader import load_split, to_records
+
+REQUEST_TIMEOUT = 30
+# Relative noise applied to numeric fields of synthetic variants.
+JITTER = 0.05
+
+
+def load_requests(path: Path) -> List[dict]:
+    """
+    Request bodies from a JSONL file: one {"data": {...}} per line, or a
+    bare feature dict, which is wrapped.
+    """
+    bodies = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            body = json.loads(line)
+            bodies.append(body if "data" in body else {"data": body})
+    return bodies
+
+
+def synthetic_requests(
+    n: int,
+    source: List[dict] = None,
+    seed: int = 42
+) -> List[dict]:
+    """
+    n request bodies drawn from source (or rows of the validation set),
+    with every numeric field jittered so no two requests are identical.
+    """
+    rng = np.random.default_rng(seed)
+    if not source:
+        df = load_split("val", nrows=max(n, 1000))
+        df = df.drop(columns=["TARGET"], errors="ignore")
+        source = [{"data": row} for row in to_records(df)]
+
+    bodies = []
+    for i in rng.integers(0, len(source), n):
+        data = {}
+        for key, value in source[i]["data"].items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = float(value) * (1 + rng.normal(0, JITTER))
+            data[key] = value
+        bodies.append({"data": data})
+    return bodies
+
+
+def in_process_sender(endpoint: str) -> Tuple[Callable[[dict], int], Callable]:
+    """
+    (send, close) posting to the app through FastAPI's TestClient; startup
+    and shutdown hooks run as they would under uvicorn.
+    """
+    from fastapi.testclient import TestClient
+    from src.inference.app import app
+
+    client = TestClient(app)
+    client.__enter__()
+
+    def send(body: dict) -> int:
+        return client.post(endpoint, json=body).status_code
+
+    return send, lambda: client.__exit__(None, None, None)
+
+
+def http_sender(
+    url: str,
+    endpoint: str
+) -> Tuple[Callable[[dict], int], Callable]:
+    """
+    (send, close) posting to a running server, one keep-alive session per
+    thread.
+    """
+    import requests
+
+    local = threading.local()
+
+    def send(body: dict) -> int:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        return session.post(
+            url.rstrip("/") + endpoint, json=body, timeout=REQUEST_TIMEOUT
+        ).status_code
+
+    return send, lambda: None
+
+
+def run_load(
+    send: Callable[[dict], int],
+    bodies: List[dict],
+    concurrency: int = 1,
+    rate: Optional[float] = None
+) -> dict:
+    """
+    Send every body with `concurrency` workers. With a rate (requests per
+    second) request i is due at start + i / rate and its latency counts
+    from that moment, so time spent queued behind slow requests is not
+    hidden; without one, workers send back to back.
+    """
+    latencies = [None] * len(bodies)
+    errors = []
+    start = time.perf_counter()
+
+    def one(i: int):
+        due = start + i / rate if rate else time.perf_counter()
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if not rate:
+            due = time.perf_counter()
+        try:
+            status = send(bodies[i])
+            if status >= 400:
+                errors.append(status)
+        except Exception as e:
+            errors.append(type(e).__name__)
+        latencies[i] = time.perf_counter() - due
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(len(bodies))))
+
+    elapsed = time.perf_counter() - start
+    done = [lat for lat in latencies if lat is not None]
+    return {
+        "requests": len(bodies),
+        "errors": len(errors),
+        "error_samples": [str(e) for e in errors[:10]],
+        "duration_s": round(elapsed, 3),
+        "requests_per_second": round(len(bodies) / elapsed, 2) if elapsed else None,
+        "latency_ms": latency_summary(done)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=Path, help="JSONL file of request bodies")
+    parser.add_argument(
+        "--synthetic", type=int,
+        help="send this many jittered variants of the requests (or of validation rows)"
+    )
+    parser.add_argument("--url", help="server base URL; in-process when omitted")
+    parser.add_argument("--endpoint", default="/predict")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--rate", type=float, help="target requests per second")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    bodies = load_requests(args.requests) if args.requests else []
+    if args.synthetic:
+        bodies = synthetic_requests(args.synthetic, bodies)
+    if not bodies:
+        parser.error("no requests: pass --requests and/or --synthetic")
+
+    if args.url:
+        send, close = http_sender(args.url, args.endpoint)
+    else:
+        send, close = in_process_sender(args.endpoint)
+    try:
+        for body in bodies[:args.warmup]:
+            send(body)
+        result = run_load(send, bodies, args.concurrency, args.rate)
+    finally:
+        close()
+
+    result = {
+        "benchmark": "load_test",
+        "target": args.url or "in_process",
+        "endpoint": args.endpoint,
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        **result,
+        "environment": environment()
+    }
+    print(json.dumps({k: result[k] for k in (
+        "requests", "errors", "requests_per_second", "latency_ms"
+    )}, indent=2))
+    write_result(result, args.output, "load_test")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Compare the dense and sparse training pipelines on the processed splits:
+fit time, peak RSS, size of the design matrix and validation metrics.
+
+    python -m src.benchmarks.train_bench --rows 50000
+
+Each mode runs in its own process so peak RSS is measured per mode.
+"""
+import argparse
+import multiprocessing
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Optional
+from scipy import sparse as sp
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from src.benchmarks.common import environment, write_result
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+MODES = ["dense", "sparse"]
+TARGET = "TARGET"
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _matrix_mb(matrix) -> float:
+    if sp.issparse(matrix):
+        matrix = matrix.tocsr()
+        size = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    else:
+        size = np.asarray(matrix).nbytes
+    return round(size / 2**20, 2)
+
+
+def run_mode(mode: str, rows: Optional[int]) -> dict:
+    """
+    Fit the train.py pipeline in the given mode and score it on val.
+    """
+    from src.data.loader import load_split, load_xy
+    from src.data.preprocess_features import as_float32, build_preprocessor
+    from src.models.train import evaluate
+
+    sparse = mode == "sparse"
+    train = load_split("train", nrows=rows)
+    X_train, y_train = train.drop(columns=[TARGET]), train[TARGET]
+    X_val, y_val = load_xy("val")
+    if sparse:
+        X_train, X_val = as_float32(X_train), as_float32(X_val)
+    rss_loaded = _peak_rss_mb()
+
+    preprocessor, _, _ = build_preprocessor(
+        pd.concat([X_train, y_train], axis=1), sparse=sparse
+    )
+    pipeline = Pipeline(
+        steps=[
+            ("preprocessor", preprocessor),
+            ("classifier", LogisticRegression(
+                max_iter=1000,
+                class_weight="balanced",
+                solver="lbfgs",
+                n_jobs=-1
+            ))
+        ]
+    )
+    started = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    matrix = pipeline.named_steps["preprocessor"].transform(X_train)
+    return {
+        "mode": mode,
+        "train_rows": len(X_train),
+        "fit_seconds": round(fit_seconds, 3),
+        "iterations": int(pipeline.named_steps["classifier"].n_iter_[0]),
+        "matrix": {
+            "format": "csr" if sp.issparse(matrix) else "dense",
+            "dtype": str(matrix.dtype),
+            "shape": list(matrix.shape),
+            "mb": _matrix_mb(matrix)
+        },
+        "peak_rss_mb_after_load": rss_loaded,
+        "peak_rss_mb": _peak_rss_mb(),
+        "val_metrics": {k: round(float(v), 5) for k, v in evaluate(pipeline, X_val, y_val).items()}
+    }
+
+
+def _worker(mode: str, rows: Optional[int], results):
+    results.put(run_mode(mode, rows))
+
+
+def run_isolated(mode: str, rows: Optional[int]) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_worker, args=(mode, rows, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, help="limit the training rows")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    modes = []
+    for mode in args.modes:
+        result = run_isolated(mode, args.rows)
+        print(f"{mode}: fit {result['fit_seconds']}s, "
+              f"peak RSS {result['peak_rss_mb']} MB, "
+              f"matrix {result['matrix']['mb']} MB, "
+              f"val ROC AUC {result['val_metrics']['roc_auc']}")
+        modes.append(result)
+
+    result = {
+        "benchmark": "train_preprocessing",
+        "parameters": {"rows": args.rows},
+        "modes": modes,
+        "environment": environment()
+    }
+    write_result(result, args.output, "train_preprocessing")
+
+
+if __name__ == "__main__":
+    main()
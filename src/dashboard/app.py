@@ -1,4 +1,3 @@
-import json
 import streamlit as st
 import pandas as pd
 import requests
@@ -6,9 +5,12 @@ from pathlib import Path
 import mlflow
 import os
 import pickle
+from src.monitoring.store import read_predictions, feature_columns
 
 API_BASE = "http://127.0.0.1:8000"
-LOG_PATH = Path(r"D:\College\Data Drift Detection\logs\predictions.csv")
+# Streamlit reruns the script on every interaction, so each rerun reads only
+# the newest rows of the prediction log; the charts below cover these.
+RECENT_ROWS = 1000
 
 st.set_page_config(page_title="MLOps Drift Dashboard", layout="wide")
 
@@ -30,35 +32,24 @@ if st.button("Run Drift Check"):
         st.error(f"Drift check failed: {e}")
 
 st.header("Feature-level Drift")
-if LOG_PATH.exists():
-    df = pd.read_csv(LOG_PATH)
-    if df.empty:
-        st.warning("Prediction log exists but is empty.")
-    else:
-        if "timestamp" in df.columns:
-            df = df.sort_values("timestamp")
-        try:
-            df["parsed_features"] = df["features"].apply(json.loads)
-        except Exception as e:
-            st.error(f"Failed to parse feature JSON: {e}")
-            st.stop()
-        features_df = pd.json_normalize(df["parsed_features"])
-        st.subheader("Recent Feature Values (last 20 samples)")
-        st.dataframe(features_df.tail(20))
-        if "probability" in df.columns:
-            st.subheader("Prediction Confidence Over Time")
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            st.line_chart(
-                df.set_index("timestamp")["probability"]
-            )
-        if "prediction" in df.columns:
-            st.subheader("Prediction Distribution")
-            st.bar_chart(
-                df["prediction"].value_counts()
-            )
-        st.subheader("Feature Snapshot")
-        sample_features = df["features"].tail(50).apply(lambda x: pd.Series(eval(x)))
-        st.dataframe(sample_features.describe())
+df = read_predictions(last_n=max(window_size, RECENT_ROWS))
+if not df.empty:
+    features_df = df[feature_columns(df)]
+    st.subheader("Recent Feature Values (last 20 samples)")
+    st.dataframe(features_df.tail(20))
+    if "probability" in df.columns:
+        st.subheader(f"Prediction Confidence Over Time (last {len(df)} predictions)")
+        st.line_chart(
+            df.set_index("timestamp")["probability"]
+        )
+    if "prediction" in df.columns:
+        st.subheader("Prediction Distribution")
+        st.bar_chart(
+            df["prediction"].value_counts()
+        )
+    st.subheader("Feature Snapshot")
+    sample_features = features_df.tail(50)
+    st.dataframe(sample_features.describe())
 else:
     st.warning("No prediction logs found.")
 
@@ -0,0 +1,154 @@
+"""
+Typed train/val/test splits.
+
+preprocess.py writes each split as data/processed/<split>.parquet with a
+shared schema (also saved as schema.json): integers downcast to the
+smallest type that holds them, floats as float32 and strings as
+dictionary-encoded categoricals with the same categories in every split.
+Readers go through load_split, which reads only the requested columns and
+falls back to <split>.csv (cast to the schema when there is one).
+"""
+import json
+import pandas as pd
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+PROCESSED_DATA_PATH = Path("data/processed")
+SCHEMA_FILE = "schema.json"
+TARGET = "TARGET"
+
+
+def build_schema(df: pd.DataFrame) -> Dict[str, dict]:
+    """
+    Compact dtype for every column of df, decided on the full dataset so
+    that every split is cast the same way.
+    """
+    schema = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            schema[col] = {"dtype": "bool"}
+        elif pd.api.types.is_integer_dtype(series):
+            schema[col] = {"dtype": str(pd.to_numeric(series, downcast="integer").dtype)}
+        elif pd.api.types.is_float_dtype(series):
+            schema[col] = {"dtype": "float32"}
+        else:
+            categories = sorted(series.dropna().astype(str).unique())
+            schema[col] = {"dtype": "category", "categories": categories}
+    return schema
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, dict]) -> pd.DataFrame:
+    """
+    Cast the columns of df that schema knows; values outside a column's
+    categories become missing, as they would in a typed split.
+    """
+    casts = {}
+    for col in df.columns:
+        spec = schema.get(col)
+        if spec is None:
+            continue
+        if spec["dtype"] == "category":
+            casts[col] = pd.CategoricalDtype(spec["categories"])
+            df[col] = df[col].astype(object).where(df[col].isna(), df[col].astype(str))
+        elif spec["dtype"].startswith(("int", "uint")) and df[col].isna().any():
+            casts[col] = "float32"
+        else:
+            casts[col] = spec["dtype"]
+    return df.astype(casts)
+
+
+def save_schema(schema: Dict[str, dict], data_dir: Path = PROCESSED_DATA_PATH):
+    with open(data_dir / SCHEMA_FILE, "w") as f:
+        json.dump(schema, f, indent=2)
+
+
+def load_schema(data_dir: Path = PROCESSED_DATA_PATH) -> Optional[Dict[str, dict]]:
+    path = data_dir / SCHEMA_FILE
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def split_path(split_name: str, data_dir: Path = PROCESSED_DATA_PATH) -> Path:
+    """
+    The Parquet split when it exists, otherwise the legacy CSV.
+    """
+    path = data_dir / f"{split_name}.parquet"
+    return path if path.exists() else data_dir / f"{split_name}.csv"
+
+
+def split_columns(split_name: str, data_dir: Path = PROCESSED_DATA_PATH) -> List[str]:
+    path = split_path(split_name, data_dir)
+    if path.suffix == ".parquet":
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _read_csv(
+    path: Path,
+    columns: Optional[List[str]],
+    nrows: Optional[int],
+    data_dir: Path
+) -> pd.DataFrame:
+    df = pd.read_csv(path, usecols=columns, nrows=nrows)
+    schema = load_schema(data_dir)
+    return apply_schema(df, schema) if schema else df
+
+
+def load_split(
+    split_name: str,
+    columns: Optional[List[str]] = None,
+    nrows: Optional[int] = None,
+    data_dir: Path = PROCESSED_DATA_PATH
+) -> pd.DataFrame:
+    """
+    A split as a typed frame, reading only columns (all when None) and
+    only the first nrows rows when given.
+    """
+    path = split_path(split_name, data_dir)
+    if path.suffix != ".parquet":
+        return _read_csv(path, columns, nrows, data_dir)
+    if nrows is None:
+        return pd.read_parquet(path, columns=columns)
+    batch = next(pq.ParquetFile(path).iter_batches(batch_size=nrows, columns=columns), None)
+    if batch is None:
+        return pd.read_parquet(path, columns=columns)
+    return batch.to_pandas()
+
+
+def load_xy(
+    split_name: str,
+    columns: Optional[List[str]] = None,
+    data_dir: Path = PROCESSED_DATA_PATH
+):
+    """
+    (features, target) of a split; columns restricts the features.
+    """
+    if columns is not None:
+        columns = [c for c in columns if c != TARGET] + [TARGET]
+    df = load_split(split_name, columns, data_dir=data_dir)
+    return df.drop(columns=[TARGET]), df[TARGET]
+
+
+def iter_split_batches(
+    path: Path,
+    columns: Optional[List[str]] = None,
+    batch_rows: int = 100000
+) -> Iterator[pd.DataFrame]:
+    """
+    A Parquet split batch_rows rows at a time, for streaming readers.
+    """
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=columns):
+        yield batch.to_pandas()
+
+
+def to_records(df: pd.DataFrame) -> List[dict]:
+    """
+    Rows as JSON-ready dicts: Python floats and strings, None for missing.
+    """
+    df = df.astype(object)
+    return df.where(df.notna(), None).to_dict("records")
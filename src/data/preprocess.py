@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from src.data.loader import build_schema, apply_schema, save_schema
 
 RAW_DATA_PATH = Path("data/raw/application_train.csv")
 PROCESSED_DATA_PATH = Path("data/processed")
@@ -47,9 +48,15 @@ def time_based_split(df: pd.DataFrame) -> dict:
     }
 
 def save_splits(splits: dict):
+    """
+    Write each split as typed Parquet, cast with one schema built on all
+    rows so categoricals share their categories across splits.
+    """
+    schema = build_schema(pd.concat(splits.values()))
+    save_schema(schema, PROCESSED_DATA_PATH)
     for split_name, split_df in splits.items():
-        split_df.to_csv(
-            PROCESSED_DATA_PATH / f"{split_name}.csv",
+        apply_schema(split_df.copy(), schema).to_parquet(
+            PROCESSED_DATA_PATH / f"{split_name}.parquet",
             index=False
         )
 
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
@@ -5,16 +6,31 @@ from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.impute import SimpleImputer
 
 
-def build_preprocessor(df: pd.DataFrame):
+def as_float32(X: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts numeric columns to float32, so the sparse preprocessor keeps
+    its whole output in float32.
+    """
+    numeric = X.select_dtypes(include="number").columns
+    return X.astype({col: np.float32 for col in numeric})
+
+
+def build_preprocessor(df: pd.DataFrame, sparse: bool = False):
     """
     Builds a preprocessing pipeline for numerical and categorical features.
+
+    With sparse=True the one-hot columns are encoded as a sparse float32
+    matrix and the transformed output is always CSR; pair it with
+    as_float32 on the frames it fits and scores to avoid float64 upcasts.
     """
     DROP_COLS = ["TARGET", "SK_ID_CURR"]
     feature_df = df.drop(
         columns=[c for c in DROP_COLS if c in df.columns]
     )
-    numeric_features = feature_df.select_dtypes(include=["int64", "float64"]).columns
-    categorical_features = feature_df.select_dtypes(include=["object"]).columns
+    numeric_features = feature_df.select_dtypes(include="number").columns
+    categorical_features = feature_df.select_dtypes(
+        include=["object", "category", "string"]
+    ).columns
     numeric_pipeline = Pipeline(
         steps=[
             ("imputer", SimpleImputer(strategy="median")),
@@ -28,7 +44,8 @@ def build_preprocessor(df: pd.DataFrame):
                 "encoder",
                 OneHotEncoder(
                     handle_unknown="ignore",
-                    sparse_output=False
+                    sparse_output=sparse,
+                    dtype=np.float32 if sparse else np.float64
                 )
             )
         ]
@@ -37,7 +54,8 @@ def build_preprocessor(df: pd.DataFrame):
         transformers=[
             ("num", numeric_pipeline, numeric_features),
             ("cat", categorical_pipeline, categorical_features)
-        ]
+        ],
+        sparse_threshold=1.0 if sparse else 0.3
     )
 
     return preprocessor, numeric_features, categorical_features
@@ -1,79 +1,120 @@
 import pandas as pd
-import json
-import numpy as np
-from scipy.stats import ks_2samp
-from pathlib import Path
-import pickle
-
-LOG_FILE = Path("logs/predictions.csv")
-REF_STATS_PATH = Path("src/inference/reference_stats.pkl")
-
-
-def load_reference_stats():
-    with open(REF_STATS_PATH, "rb") as f:
-        return pickle.load(f)
+from typing import Dict
+from src.drift.engine import DriftEngine
+from src.drift.metrics import MetricEngine
+from src.drift.reference_store import (
+    REF_STORE_DIR,
+    ReferenceStore,
+    header_mtime,
+    open_reference_store
+)
+from src.monitoring.store import read_predictions, feature_columns
+from src.monitoring.window import FeatureWindow
+
+_engine_cache = {}
+
+
+def load_reference_store() -> ReferenceStore:
+    """
+    The memory-mapped reference store, reopened only when it is rebuilt.
+    """
+    store = _engine_cache.get("store")
+    if store is None or _engine_cache["mtime"] != header_mtime(REF_STORE_DIR):
+        store = open_reference_store(REF_STORE_DIR)
+        _engine_cache.clear()
+        _engine_cache["store"] = store
+        _engine_cache["mtime"] = header_mtime(REF_STORE_DIR)
+    return store
+
+
+def load_reference_engine() -> DriftEngine:
+    """
+    KS engine over the mapped reference values.
+    """
+    store = load_reference_store()
+    if "engine" not in _engine_cache:
+        _engine_cache["engine"] = store.engine()
+    return _engine_cache["engine"]
+
+
+def load_metric_engine() -> MetricEngine:
+    """
+    Metric engine over the reference store's precomputed bins.
+    """
+    engine = load_reference_engine()
+    if "metrics" not in _engine_cache:
+        _engine_cache["metrics"] = MetricEngine(
+            load_reference_store().bins(), engine
+        )
+    return _engine_cache["metrics"]
 
 
 def load_recent_predictions(n: int = 100):
-    if not LOG_FILE.exists():
+    df = read_predictions(last_n=n)
+    if df.empty:
         return None
-
-    df = pd.read_csv(LOG_FILE)
-    if "timestamp" in df.columns:
-        df = df.sort_values("timestamp")
-
-    return df.tail(n)
-
-
-def aggregate_drift(window_size: int = 100):
-    reference_stats = load_reference_stats()
-    recent_df = load_recent_predictions(window_size)
-
-    if recent_df is None or recent_df.empty:
+    return df
+
+
+def aggregate_drift(
+    window_size: int = 100,
+    window: FeatureWindow = None,
+    metrics: Dict[str, str] = None
+):
+    """
+    Drift of the last window_size predictions against the reference, for
+    numeric and categorical features alike.
+
+    metrics selects the metric judging each feature, by feature name or
+    by type ("numeric" / "categorical"); unlisted features use KS
+    (numeric) or chi-square (categorical). Every feature also reports the
+    other binned metrics.
+
+    When an in-memory window large enough for the request is given it is
+    used directly; otherwise the rows are read from the prediction store.
+    """
+    engine = load_metric_engine()
+
+    if window is not None and window_size <= window.capacity:
+        timestamps, feature_values = window.recent(window_size)
+    else:
+        recent_df = load_recent_predictions(window_size)
+        if recent_df is None:
+            return {"status": "no_data"}
+        timestamps = recent_df["timestamp"].to_numpy()
+        feature_values = {}
+        for col in feature_columns(recent_df):
+            if pd.api.types.is_numeric_dtype(recent_df[col]):
+                feature_values[col] = recent_df[col].to_numpy(
+                    dtype=float, na_value=float("nan")
+                )
+            else:
+                feature_values[col] = recent_df[col].to_numpy(dtype=object)
+
+    if len(timestamps) == 0:
         return {"status": "no_data"}
 
-    feature_values = {}
-    for row in recent_df["features"]:
-        try:
-            parsed = json.loads(row)
-        except Exception:
-            continue
-
-        for k, v in parsed.items():
-            if isinstance(v, (int, float)):
-                feature_values.setdefault(k, []).append(v)
-
     drift_summary = {}
+    results = engine.evaluate(feature_values, metrics, min_samples=10)
 
-    for feature, values in feature_values.items():
-        if feature not in reference_stats:
-            continue
-
-        ref_values = reference_stats[feature]["values"]
-        cur_values = np.array(values)
-        if len(cur_values) < 10:
-            continue
-
-        _, p_value = ks_2samp(ref_values, cur_values)
-
+    for feature, result in results.items():
         drift_summary[feature] = {
-            "p_value": round(float(p_value), 6),
-            "drift_detected": bool(p_value < 0.05)
+            key: round(value, 6) if isinstance(value, float) else value
+            for key, value in result.items()
         }
+        drift_summary[feature]["drift_detected"] = bool(result["drift_detected"])
 
     drifted_features = sum(
         1 for v in drift_summary.values() if v["drift_detected"]
     )
-    sample_count = len(recent_df)
+    sample_count = len(timestamps)
     return {
         "status": "ok",
         "window_size": sample_count,
         "samples": sample_count,
         "time_range": {
-            "from": recent_df["timestamp"].iloc[0]
-            if "timestamp" in recent_df.columns else None,
-            "to": recent_df["timestamp"].iloc[-1]
-            if "timestamp" in recent_df.columns else None
+            "from": pd.Timestamp(timestamps[0]).isoformat(),
+            "to": pd.Timestamp(timestamps[-1]).isoformat()
         },
         "total_features_checked": len(drift_summary),
         "drifted_features": drifted_features,
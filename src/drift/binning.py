@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+N_BINS = 20
+MAX_CATEGORIES = 50
+OTHER = "__other__"
+
+
+def quantile_edges(values: np.ndarray, n_bins: int = N_BINS) -> np.ndarray:
+    """
+    Interior bin edges at the reference quantiles, so each bin holds about
+    the same share of the reference. Repeated quantiles (e.g. flag columns)
+    collapse into a single edge.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.empty(0)
+    quantiles = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])
+    return np.unique(quantiles)
+
+
+def numeric_bins(values: np.ndarray, n_bins: int = N_BINS) -> dict:
+    """
+    Quantile bins of a numeric reference column. Bin k holds values in
+    [edges[k - 1], edges[k]); the first and last bins are open-ended.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    edges = quantile_edges(values, n_bins)
+    counts = np.bincount(
+        np.searchsorted(edges, values, side="right"),
+        minlength=len(edges) + 1
+    )
+    return {
+        "type": "numeric",
+        "edges": edges,
+        "counts": counts,
+        "lo": float(values.min()),
+        "hi": float(values.max()),
+        "std": float(values.std())
+    }
+
+
+def categorical_bins(values, max_categories: int = MAX_CATEGORIES) -> dict:
+    """
+    Frequency table of a categorical reference column. The most frequent
+    max_categories categories get their own bin and the rest share a final
+    OTHER bin, which is also where unseen categories land.
+    """
+    frequencies = pd.Series(values).dropna().astype(str).value_counts()
+    top = frequencies.iloc[:max_categories]
+    counts = np.append(top.to_numpy(), frequencies.iloc[max_categories:].sum())
+    return {
+        "type": "categorical",
+        "categories": list(top.index),
+        "counts": counts.astype(np.int64)
+    }
+
+
+def build_reference_bins(
+    df: pd.DataFrame,
+    n_bins: int = N_BINS,
+    max_categories: int = MAX_CATEGORIES
+) -> Dict[str, dict]:
+    """
+    Reference bins for every numeric and string column of df with at
+    least one value.
+    """
+    bins = {}
+    for col in df.columns:
+        series = df[col].dropna()
+        if series.empty:
+            continue
+        if pd.api.types.is_numeric_dtype(series):
+            bins[col] = numeric_bins(series.to_numpy(dtype=np.float64), n_bins)
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            bins[col] = categorical_bins(series, max_categories)
+    return bins
+
+
+def bin_counts(spec: dict, values) -> np.ndarray:
+    """
+    Counts of values over the bins of spec; missing values are skipped.
+    """
+    if spec["type"] == "numeric":
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        return np.bincount(
+            np.searchsorted(spec["edges"], values, side="right"),
+            minlength=len(spec["edges"]) + 1
+        )
+
+    values = pd.Series(values, dtype=object).dropna().astype(str)
+    lookup = {c: i for i, c in enumerate(spec["categories"])}
+    codes = values.map(lookup).fillna(len(spec["categories"])).astype(np.int64)
+    return np.bincount(codes.to_numpy(), minlength=len(spec["categories"]) + 1)
+
+
+def category_scores(spec: dict) -> Dict[str, tuple]:
+    """
+    (frequency, tail_probability) of each reference category, where the
+    tail probability is the reference mass of categories no more frequent
+    than it. OTHER covers every category outside the table.
+    """
+    counts = spec["counts"]
+    total = max(int(counts.sum()), 1)
+    proportions = counts / total
+    order = np.argsort(proportions, kind="stable")
+    tails = np.empty(len(counts))
+    tails[order] = np.cumsum(proportions[order])
+    # Ties share the largest cumulative mass among them.
+    for p in np.unique(proportions):
+        tied = proportions == p
+        tails[tied] = tails[tied].max()
+    names = spec["categories"] + [OTHER]
+    return {
+        name: (float(proportion), float(min(tail, 1.0)))
+        for name, proportion, tail in zip(names, proportions, tails)
+    }
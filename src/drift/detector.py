@@ -1,37 +1,44 @@
 import numpy as np
 import pandas as pd
-from scipy.stats import ks_2samp
 from typing import Dict
+from src.drift.binning import build_reference_bins
+from src.drift.engine import DriftEngine
+from src.drift.metrics import MetricEngine
 
 
 class DriftDetector:
     """
-    Pure stateless statistical drift detector using the Kolmogorov-Smirnov test.
+    Pure stateless statistical drift detector: Kolmogorov-Smirnov tests for
+    numeric columns and chi-square tests for categorical ones, unless
+    metrics selects otherwise (see MetricEngine.metric_for).
     """
 
-    def __init__(self, reference_df: pd.DataFrame):
-        self.reference_df = reference_df.select_dtypes(include=[np.number])
+    def __init__(self, reference_df: pd.DataFrame, metrics: Dict[str, str] = None):
+        self.reference_df = reference_df
+        numeric_df = reference_df.select_dtypes(include=[np.number])
+        self.engine = MetricEngine(
+            build_reference_bins(reference_df),
+            DriftEngine({
+                col: numeric_df[col].values
+                for col in numeric_df.columns
+            })
+        )
+        self.metrics = metrics
 
     def detect(self, current_df: pd.DataFrame) -> Dict[str, Dict]:
         drift_report = {}
 
-        current_df = current_df.select_dtypes(include=[np.number])
-
-        for col in self.reference_df.columns:
-            if col not in current_df.columns:
-                continue
-
-            ref_values = self.reference_df[col].dropna().values
-            cur_values = current_df[col].dropna().values
-
-            if len(cur_values) < 10:
-                continue
-
-            _, p_value = ks_2samp(ref_values, cur_values)
+        current = {
+            col: current_df[col].values
+            for col in self.engine.features
+            if col in current_df.columns
+        }
 
+        results = self.engine.evaluate(current, self.metrics, min_samples=10)
+        for col, result in results.items():
             drift_report[col] = {
-                "p_value": float(p_value),
-                "drift_detected": bool(p_value < 0.05)
+                **result,
+                "drift_detected": bool(result["drift_detected"])
             }
 
         return drift_report
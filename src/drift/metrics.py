@@ -0,0 +1,201 @@
+import numpy as np
+from scipy.stats import chi2
+from typing import Dict, List, Optional
+from src.drift.binning import bin_counts
+from src.drift.engine import DriftEngine
+
+NUMERIC_METRICS = ("ks", "psi", "wasserstein", "js", "chi_square")
+CATEGORICAL_METRICS = ("psi", "js", "chi_square")
+DEFAULT_METRICS = {"numeric": "ks", "categorical": "chi_square"}
+P_VALUE_METRICS = ("ks", "chi_square")
+
+# Distance metrics flag drift above these values: PSI's usual "significant
+# shift" cut-off, JS divergence in bits, and Wasserstein distance in units
+# of the reference standard deviation. Test metrics flag p < P_VALUE_THRESHOLD.
+THRESHOLDS = {"psi": 0.2, "js": 0.1, "wasserstein": 0.1}
+P_VALUE_THRESHOLD = 0.05
+# Floor for empty-bin proportions in PSI.
+EPS = 1e-4
+
+
+def binned_metrics(
+    reference: np.ndarray,
+    current: np.ndarray,
+    positions: np.ndarray,
+    scale: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    PSI, Jensen-Shannon divergence, two-sample chi-square and Wasserstein
+    distance for every feature at once.
+
+    reference and current are F x B bin counts padded with zero bins;
+    positions holds each bin's location (NaN for categorical features,
+    whose Wasserstein distance is then NaN) and scale each feature's
+    reference standard deviation.
+    """
+    n_ref = reference.sum(axis=1, keepdims=True)
+    n_cur = current.sum(axis=1, keepdims=True)
+    p = reference / np.maximum(n_ref, 1)
+    q = current / np.maximum(n_cur, 1)
+    used = (reference + current) > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_floor, q_floor = np.maximum(p, EPS), np.maximum(q, EPS)
+        psi = np.where(used, (q_floor - p_floor) * np.log(q_floor / p_floor), 0)
+
+        m = (p + q) / 2
+        kl_p = np.where(p > 0, p * np.log2(p / m), 0)
+        kl_q = np.where(q > 0, q * np.log2(q / m), 0)
+
+        # 2 x B contingency table per feature: reference vs current.
+        total = reference + current
+        n = n_ref + n_cur
+        e_ref, e_cur = total * n_ref / n, total * n_cur / n
+        cells = (reference - e_ref) ** 2 / e_ref + (current - e_cur) ** 2 / e_cur
+        chi_square = np.where(used, cells, 0).sum(axis=1)
+
+    dof = used.sum(axis=1) - 1
+    chi_square_p = np.where(
+        dof > 0, chi2.sf(chi_square, np.maximum(dof, 1)), 1.0
+    )
+
+    # Earth mover's distance with each bin's mass at its position.
+    cdf_gap = np.abs(np.cumsum(p - q, axis=1))[:, :-1]
+    wasserstein = np.nansum(cdf_gap * np.diff(positions, axis=1), axis=1)
+    wasserstein = np.where(np.isnan(positions[:, 0]), np.nan, wasserstein)
+
+    return {
+        "psi": psi.sum(axis=1),
+        "js": np.clip(0.5 * (kl_p.sum(axis=1) + kl_q.sum(axis=1)), 0, 1),
+        "chi_square": chi_square,
+        "chi_square_p_value": chi_square_p,
+        "wasserstein": wasserstein / scale
+    }
+
+
+def _positions(spec: dict) -> np.ndarray:
+    if spec["type"] != "numeric":
+        return np.full(len(spec["counts"]), np.nan)
+    edges = np.concatenate([[spec["lo"]], spec["edges"], [spec["hi"]]])
+    return (edges[:-1] + edges[1:]) / 2
+
+
+class MetricEngine:
+    """
+    Drift metrics of a window against precomputed reference bins.
+
+    Every feature's window is binned once and PSI, JS divergence, chi-square
+    and (numeric) Wasserstein distance come out of one vectorized pass over
+    the padded count matrices. Each feature is judged by a single selected
+    metric; exact KS tests, when selected, go through the presorted
+    DriftEngine.
+    """
+
+    def __init__(
+        self,
+        bins: Dict[str, dict],
+        ks_engine: Optional[DriftEngine] = None
+    ):
+        self.bins = bins
+        self.features = list(bins)
+        self.index = {f: i for i, f in enumerate(self.features)}
+        width = max((len(spec["counts"]) for spec in bins.values()), default=1)
+        self.reference = np.zeros((len(self.features), width))
+        self.positions = np.full((len(self.features), width), np.nan)
+        self.scale = np.ones(len(self.features))
+        for i, feature in enumerate(self.features):
+            spec = bins[feature]
+            self.reference[i, :len(spec["counts"])] = spec["counts"]
+            self.positions[i, :len(spec["counts"])] = _positions(spec)
+            if spec["type"] == "numeric" and spec["std"] > 0:
+                self.scale[i] = spec["std"]
+
+        if ks_engine is None:
+            ks_engine = DriftEngine({})
+        self.ks_engine = ks_engine
+
+    def metric_for(self, feature: str, metrics: Dict[str, str]) -> str:
+        """
+        The metric judging feature: its own entry in metrics, else the
+        entry for its type ("numeric" / "categorical"), else the default
+        for its type. Metrics that do not apply to the type are ignored.
+        """
+        kind = self.bins[feature]["type"]
+        allowed = NUMERIC_METRICS if kind == "numeric" else CATEGORICAL_METRICS
+        for metric in (metrics.get(feature), metrics.get(kind)):
+            if metric in allowed:
+                if metric == "ks" and feature not in self.ks_engine.index:
+                    continue
+                return metric
+        return DEFAULT_METRICS[kind]
+
+    def evaluate(
+        self,
+        current: Dict[str, np.ndarray],
+        metrics: Optional[Dict[str, str]] = None,
+        min_samples: int = 1
+    ) -> Dict[str, dict]:
+        """
+        Per-feature drift of current values against the reference, for the
+        features with at least min_samples non-missing current values.
+        """
+        metrics = metrics or {}
+        features: List[str] = []
+        rows = []
+        for feature, values in current.items():
+            if feature not in self.index:
+                continue
+            try:
+                counts = bin_counts(self.bins[feature], values)
+            except (TypeError, ValueError):
+                # e.g. strings logged for a numeric reference column
+                continue
+            if counts.sum() < min_samples:
+                continue
+            features.append(feature)
+            rows.append(counts)
+        if not features:
+            return {}
+
+        idx = np.array([self.index[f] for f in features])
+        counts = np.zeros((len(features), self.reference.shape[1]))
+        for row, feature_counts in enumerate(rows):
+            counts[row, :len(feature_counts)] = feature_counts
+        stats = binned_metrics(
+            self.reference[idx], counts, self.positions[idx], self.scale[idx]
+        )
+
+        selected = {f: self.metric_for(f, metrics) for f in features}
+        ks_results = self.ks_engine.ks_test(
+            {f: current[f] for f in features if selected[f] == "ks"},
+            min_samples=min_samples
+        )
+
+        results = {}
+        for row, feature in enumerate(features):
+            metric = selected[feature]
+            result = {
+                "metric": metric,
+                "samples": int(counts[row].sum()),
+                "psi": float(stats["psi"][row]),
+                "js": float(stats["js"][row]),
+                "chi_square": float(stats["chi_square"][row])
+            }
+            if self.bins[feature]["type"] == "numeric":
+                result["wasserstein"] = float(stats["wasserstein"][row])
+
+            if metric == "ks":
+                ks = ks_results.get(feature)
+                if ks is None:
+                    continue
+                result["statistic"] = ks["statistic"]
+                result["p_value"] = ks["p_value"]
+            elif metric == "chi_square":
+                result["p_value"] = float(stats["chi_square_p_value"][row])
+
+            if metric in P_VALUE_METRICS:
+                result["drift_detected"] = result["p_value"] < P_VALUE_THRESHOLD
+            else:
+                result["drift_detected"] = result[metric] > THRESHOLDS[metric]
+            results[feature] = result
+        return results
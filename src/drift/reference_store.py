@@ -0,0 +1,203 @@
+import json
+import os
+import pickle
+import uuid
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List
+from src.drift.binning import MAX_CATEGORIES, N_BINS, quantile_edges
+from src.drift.engine import DriftEngine
+
+REF_STORE_DIR = Path("src/inference/reference")
+HEADER_FILE = "header.json"
+FORMAT_VERSION = 1
+# Percentiles kept in the header for summaries and dashboards.
+QUANTILES = np.linspace(0, 1, 101)
+
+
+class ReferenceStoreWriter:
+    """
+    Writes a reference store one feature at a time, so only the feature
+    being added has to fit in memory.
+
+    Layout: values-<build>.f64 holds every numeric feature's sorted values
+    back to back as little-endian float64; header.json records each
+    feature's offset and count, quantiles, drift bins and the categorical
+    frequency tables. The header is replaced last, so readers see either
+    the old store or the complete new one.
+    """
+
+    def __init__(self, path: Path = REF_STORE_DIR, n_bins: int = N_BINS):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.n_bins = n_bins
+        self.values_file = f"values-{uuid.uuid4().hex[:12]}.f64"
+        self._values = open(self.path / self.values_file, "wb")
+        self._offset = 0
+        self.numeric: Dict[str, dict] = {}
+        self.categorical: Dict[str, dict] = {}
+
+    def add_numeric(self, feature: str, values: np.ndarray, missing: int = 0):
+        values = np.asarray(values, dtype="<f8")
+        values = np.sort(values[~np.isnan(values)])
+        if len(values) == 0:
+            return
+        self._values.write(values.tobytes())
+
+        edges = quantile_edges(values, self.n_bins)
+        self.numeric[feature] = {
+            "offset": self._offset,
+            "count": len(values),
+            "missing": int(missing),
+            "quantiles": np.quantile(values, QUANTILES).tolist(),
+            "edges": edges.tolist(),
+            "bin_counts": np.bincount(
+                np.searchsorted(edges, values, side="right"),
+                minlength=len(edges) + 1
+            ).tolist(),
+            "std": float(values.std())
+        }
+        self._offset += len(values)
+
+    def add_categorical(
+        self,
+        feature: str,
+        frequencies: pd.Series,
+        missing: int = 0,
+        max_categories: int = MAX_CATEGORIES
+    ):
+        frequencies = frequencies.sort_values(ascending=False, kind="stable")
+        top = frequencies.iloc[:max_categories]
+        self.categorical[feature] = {
+            "categories": [str(c) for c in top.index],
+            "counts": [int(c) for c in top.to_numpy()]
+            + [int(frequencies.iloc[max_categories:].sum())],
+            "missing": int(missing)
+        }
+
+    def close(self, rows: int):
+        self._values.close()
+        header = {
+            "version": FORMAT_VERSION,
+            "rows": int(rows),
+            "values_file": self.values_file,
+            "numeric": self.numeric,
+            "categorical": self.categorical
+        }
+        header_path = self.path / HEADER_FILE
+        previous = None
+        if header_path.exists():
+            with open(header_path) as f:
+                previous = json.load(f).get("values_file")
+
+        tmp_path = header_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(header, f)
+        os.replace(tmp_path, header_path)
+
+        # Workers that already mapped the old file keep their mapping.
+        if previous and previous != self.values_file:
+            (self.path / previous).unlink(missing_ok=True)
+
+
+class ReferenceStore:
+    """
+    Read side of a reference store. Values are memory-mapped read-only, so
+    every worker process serving the same store shares one copy in the
+    page cache instead of unpickling its own.
+    """
+
+    def __init__(self, path: Path = REF_STORE_DIR):
+        self.path = Path(path)
+        with open(self.path / HEADER_FILE) as f:
+            self.header = json.load(f)
+        if self.header["version"] != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported reference store version {self.header['version']}"
+            )
+        self.rows = self.header["rows"]
+        self.numeric = self.header["numeric"]
+        self.categorical = self.header["categorical"]
+        self.features: List[str] = list(self.numeric)
+
+        total = sum(meta["count"] for meta in self.numeric.values())
+        if total:
+            self.flat = np.memmap(
+                self.path / self.header["values_file"],
+                dtype="<f8", mode="r", shape=(total,)
+            )
+        else:
+            self.flat = np.empty(0)
+        self.offsets = np.array(
+            [meta["offset"] for meta in self.numeric.values()] + [total],
+            dtype=np.int64
+        )
+
+    def values(self, feature: str) -> np.ndarray:
+        """
+        Sorted, NaN-free reference values of a numeric feature (a view of
+        the mapped file).
+        """
+        meta = self.numeric[feature]
+        return self.flat[meta["offset"]:meta["offset"] + meta["count"]]
+
+    def engine(self) -> DriftEngine:
+        """
+        KS / percentile engine reading the mapped values in place.
+        """
+        return DriftEngine.from_sorted(self.features, self.flat, self.offsets)
+
+    def bins(self) -> Dict[str, dict]:
+        """
+        Reference bins in the format of src.drift.binning.
+        """
+        bins = {}
+        for feature, meta in self.numeric.items():
+            bins[feature] = {
+                "type": "numeric",
+                "edges": np.array(meta["edges"]),
+                "counts": np.array(meta["bin_counts"]),
+                "lo": meta["quantiles"][0],
+                "hi": meta["quantiles"][-1],
+                "std": meta["std"]
+            }
+        for feature, meta in self.categorical.items():
+            bins[feature] = {
+                "type": "categorical",
+                "categories": list(meta["categories"]),
+                "counts": np.array(meta["counts"])
+            }
+        return bins
+
+
+def migrate_reference_stats(pickle_path: Path, path: Path = REF_STORE_DIR):
+    """
+    Convert a legacy reference_stats.pkl into a reference store.
+    """
+    with open(pickle_path, "rb") as f:
+        reference_stats = pickle.load(f)
+
+    writer = ReferenceStoreWriter(path)
+    rows = 0
+    for feature, stats in reference_stats.items():
+        writer.add_numeric(feature, stats["values"])
+        rows = max(rows, len(stats["values"]))
+    writer.close(rows)
+    print(f"Migrated {pickle_path} to reference store {path}")
+
+
+def open_reference_store(path: Path = REF_STORE_DIR) -> ReferenceStore:
+    """
+    Open the reference store at path, converting a reference_stats.pkl
+    found next to it on first use.
+    """
+    path = Path(path)
+    legacy = path.parent / "reference_stats.pkl"
+    if not (path / HEADER_FILE).exists() and legacy.exists():
+        migrate_reference_stats(legacy, path)
+    return ReferenceStore(path)
+
+
+def header_mtime(path: Path = REF_STORE_DIR) -> float:
+    return (Path(path) / HEADER_FILE).stat().st_mtime
@@ -1,10 +1,6 @@
 import pandas as pd
-import json
 import numpy as np
-from pathlib import Path
-
-
-LOG_FILE = Path("logs/predictions.csv")
+from src.monitoring.store import count_predictions, rewrite_recent
 
 
 def inject_drift(
@@ -22,41 +18,36 @@ def inject_drift(
         - "noise" → random noise
     """
 
-    if not LOG_FILE.exists():
-        raise FileNotFoundError("predictions.csv not found")
-
-    df = pd.read_csv(LOG_FILE)
+    total = count_predictions()
+    if total == 0:
+        raise FileNotFoundError("No logged predictions found")
 
-    if len(df) < window_size:
+    if total < window_size:
         raise ValueError("Not enough samples to inject drift")
 
-    recent_idx = df.tail(window_size).index
-
-    for idx in recent_idx:
-        features = json.loads(df.at[idx, "features"])
-
-        if feature not in features:
-            continue
-
-        value = features[feature]
+    def apply_drift(df: pd.DataFrame) -> pd.DataFrame:
+        if feature not in df.columns:
+            return df
+        if not pd.api.types.is_numeric_dtype(df[feature]):
+            return df
 
-        if not isinstance(value, (int, float)):
-            continue
+        values = df[feature].to_numpy(dtype=float, na_value=np.nan)
 
         if drift_type == "shift":
-            features[feature] = value * magnitude
+            values = values * magnitude
 
         elif drift_type == "scale":
-            features[feature] = value + np.random.normal(
-                0, abs(value) * (magnitude - 1)
+            values = values + np.random.normal(
+                0, np.abs(np.nan_to_num(values)) * (magnitude - 1)
             )
 
         elif drift_type == "noise":
-            features[feature] = value + np.random.normal(0, magnitude)
+            values = values + np.random.normal(0, magnitude, len(values))
 
-        df.at[idx, "features"] = json.dumps(features)
+        df[feature] = values
+        return df
 
-    df.to_csv(LOG_FILE, index=False)
+    rewrite_recent(window_size, apply_drift)
 
     return {
         "status": "drift_injected",
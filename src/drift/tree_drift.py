@@ -1,69 +1,176 @@
+import time
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import roc_auc_score
-import json
 from pathlib import Path
-import pickle
+from src.drift.reference_store import REF_STORE_DIR, HEADER_FILE, ReferenceStore
+from src.monitoring.store import (
+    read_predictions,
+    feature_columns,
+    count_predictions,
+    subscribe
+)
+
+# Joint rows sampled from the training data by create_reference_stats.py.
+REF_SAMPLE_PATH = Path("src/inference/reference_sample.parquet")
+
+N_ESTIMATORS = 200
+TREES_PER_STEP = 25
+TIME_BUDGET = 5.0
+MAX_CACHED_RESULTS = 16
+
+_reference_cache = {}
+_result_cache = {}
+# Rewritten or cleared logs keep their length, so cached results go too.
+subscribe(lambda records: None, on_reset=_result_cache.clear)
 
-LOG_FILE = Path("logs/predictions.csv")
-REF_STATS_PATH = Path("src/inference/reference_stats.pkl")
 
 def load_reference_data(max_samples: int = 5000):
-    with open(REF_STATS_PATH, "rb") as f:
-        ref_stats = pickle.load(f)
-    min_len = min(len(stats["values"]) for stats in ref_stats.values())
-    rows = []
-    for i in range(min(min_len, max_samples)):
-        row = {}
-        for feature, stats in ref_stats.items():
-            row[feature] = stats["values"][i]
-        rows.append(row)
-    return pd.DataFrame(rows)
+    """
+    Reference rows for the drift classifier, cached until the source changes.
 
+    The joint sample is preferred. The reference store only holds each
+    column's values independently, so the fallback draws every column on
+    its own and loses correlations between features.
+    """
+    if REF_SAMPLE_PATH.exists():
+        source = REF_SAMPLE_PATH
+    else:
+        source = REF_STORE_DIR / HEADER_FILE
+    key = (source, source.stat().st_mtime, max_samples)
+    if _reference_cache.get("key") == key:
+        return _reference_cache["data"]
+
+    if source == REF_SAMPLE_PATH:
+        ref_df = pd.read_parquet(source)
+        if len(ref_df) > max_samples:
+            ref_df = ref_df.sample(max_samples, random_state=42)
+    else:
+        store = ReferenceStore(REF_STORE_DIR)
+        rng = np.random.default_rng(42)
+        ref_df = pd.DataFrame({
+            feature: rng.choice(
+                store.values(feature),
+                size=max_samples,
+                replace=len(store.values(feature)) < max_samples
+            )
+            for feature in store.features
+        })
+
+    ref_df = ref_df.select_dtypes(include=[np.number]).reset_index(drop=True)
+    _reference_cache["key"] = key
+    _reference_cache["data"] = ref_df
+    return ref_df
 
 
 def load_recent_data(n: int = 200):
-    if not LOG_FILE.exists():
+    df = read_predictions(last_n=n)
+    if df.empty:
         return None
-    df = pd.read_csv(LOG_FILE).tail(n)
-    rows = []
-    for row in df["features"]:
-        parsed = json.loads(row)
-        rows.append(parsed)
-    return pd.DataFrame(rows)
+    return df[feature_columns(df)]
 
 
-def tree_based_drift(window_size: int = 200):
-    ref_df = load_reference_data()
-    cur_df = load_recent_data(window_size)
+def _fit_within_budget(X: pd.DataFrame, y: np.ndarray, time_budget: float):
+    """
+    Grow the forest TREES_PER_STEP trees at a time on all cores until it
+    has N_ESTIMATORS trees or the time budget is spent.
+    """
+    model = RandomForestClassifier(
+        n_estimators=TREES_PER_STEP,
+        max_depth=6,
+        oob_score=True,
+        warm_start=True,
+        n_jobs=-1,
+        random_state=42
+    )
+    deadline = time.monotonic() + time_budget
+    while True:
+        model.fit(X, y)
+        if model.n_estimators >= N_ESTIMATORS or time.monotonic() >= deadline:
+            return model
+        model.n_estimators += TREES_PER_STEP
+
+
+def tree_based_drift(window_size: int = 200, time_budget: float = TIME_BUDGET):
+    """
+    Classifier two-sample test: a forest learns to tell reference rows from
+    the last window_size predictions, and its out-of-bag ROC-AUC measures
+    how separable they are (0.5 means indistinguishable).
 
-    if cur_df is None or cur_df.empty:
+    Results are cached per window and log position, so repeated calls with
+    no new predictions return immediately. A cached result is only reused
+    for a time budget no larger than the one it was fitted under, unless
+    its forest already has all N_ESTIMATORS trees.
+    """
+    recent_df = read_predictions(last_n=window_size)
+
+    if recent_df.empty:
         return {"status": "no_data"}
-    common_cols = list(set(ref_df.columns) & set(cur_df.columns))
-    ref_df = ref_df[common_cols].dropna()
-    cur_df = cur_df[common_cols].dropna()
+
+    cur_df = recent_df[feature_columns(recent_df)]
+    cache_key = (
+        window_size,
+        count_predictions(),
+        recent_df["timestamp"].iloc[-1]
+    )
+    cached_budget, cached = _result_cache.get(cache_key, (None, None))
+    if cached is not None and (
+        cached_budget >= time_budget or cached["trees"] >= N_ESTIMATORS
+    ):
+        return {**cached, "cached": True}
+
+    ref_df = load_reference_data()
+    common_cols = [
+        c for c in ref_df.columns
+        if c in cur_df.columns and pd.api.types.is_numeric_dtype(cur_df[c])
+    ]
+    # Missing values are kept: the trees route NaN at each split, and a
+    # change in missingness is drift too.
+    ref_df = ref_df[common_cols]
+    cur_df = cur_df[common_cols].astype(np.float64)
     min_size = min(len(ref_df), len(cur_df))
     ref_df = ref_df.sample(min_size, random_state=42)
     cur_df = cur_df.sample(min_size, random_state=42)
     X = pd.concat([ref_df, cur_df])
     y = np.array([0] * min_size + [1] * min_size)
-    model = RandomForestClassifier(
-        n_estimators=200,
-        max_depth=6,
-        random_state=42
-    )
-    model.fit(X, y)
 
-    probs = model.predict_proba(X)[:, 1]
-    auc = roc_auc_score(y, probs)
+    started = time.monotonic()
+    model = _fit_within_budget(X, y, time_budget)
+
+    oob = model.oob_decision_function_[:, 1]
+    scored = np.isfinite(oob)
+    # Too few trees (a small window or budget) can leave every out-of-bag
+    # scored row in one class, where ROC-AUC is undefined.
+    if np.unique(y[scored]).size < 2:
+        return {
+            "status": "insufficient_oob",
+            "reason": "out-of-bag predictions cover only one class; "
+                      "raise time_budget or window_size",
+            "samples_per_class": min_size,
+            "oob_scored": int(scored.sum()),
+            "trees": model.n_estimators,
+            "fit_seconds": round(time.monotonic() - started, 3),
+            "cached": False
+        }
+    auc = roc_auc_score(y[scored], oob[scored])
     importances = pd.Series(
         model.feature_importances_,
         index=X.columns
     ).sort_values(ascending=False)
-    return {
+    result = {
         "status": "ok",
         "drift_classifier_auc": round(float(auc), 4),
+        "auc_method": "out_of_bag",
         "drift_detected": bool(auc > 0.75),
-        "top_drift_features": importances.head(5).to_dict()
+        "top_drift_features": importances.head(5).to_dict(),
+        "samples_per_class": min_size,
+        "trees": model.n_estimators,
+        "fit_seconds": round(time.monotonic() - started, 3)
     }
+
+    _result_cache.pop(cache_key, None)
+    if len(_result_cache) >= MAX_CACHED_RESULTS:
+        _result_cache.pop(next(iter(_result_cache)))
+    _result_cache[cache_key] = (time_budget, result)
+    return {**result, "cached": False}
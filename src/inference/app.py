@@ -1,30 +1,79 @@
-import pickle
+import time
+# Start of the cold-start clock; everything below counts as import time.
+IMPORT_STARTED = time.perf_counter()
+
+import os
+import threading
 import numpy as np
-from scipy.stats import ks_2samp
-import mlflow.sklearn
 import pandas as pd
-from fastapi import FastAPI
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import Dict, Union
+from typing import Dict, List, Optional, Union
 from pathlib import Path  
-from src.monitoring.store import log_prediction
-from src.drift.analyzer import aggregate_drift
-from src.drift.alerts import evaluate_alerts
-from src.drift.alerting import generate_alert
-from src.drift.tree_drift import tree_based_drift
-from src.inference.drift_response import drift_action_handler
-from src.data.build_retraining_data import build_retraining_data
+from src.monitoring.store import (
+    log_predictions,
+    flush,
+    migrate_legacy_log,
+    start_background_writer,
+    start_follower,
+    stop_follower,
+    stop_background_writer,
+    read_predictions,
+    subscribe,
+    count_predictions,
+    writer_stats
+)
+from src.monitoring import metrics
+from src.data.loader import load_split, split_path, to_records
+from src.monitoring.window import FeatureWindow
+from src.monitoring.sketches import DriftSketches
+from src.drift.binning import OTHER, category_scores
+from src.drift.metrics import CATEGORICAL_METRICS, NUMERIC_METRICS
+from src.drift.reference_store import open_reference_store
+from src.inference.model_manager import ModelManager, LoadedModel
+from src.inference.batcher import MicroBatcher, MAX_BATCH
+from src.jobs.executor import JobExecutor
+# Drift reports, alerting, retraining (mlflow) and the tree detector
+# (sklearn.ensemble) are imported by the endpoints that use them, so they
+# stay off the path to the first prediction.
 
 MODEL_URI = "runs:/c2d895381b7548e5b1f4d014686d12f6/model" 
 app = FastAPI(title="Home Credit Inference API")
 
 BASE_DIR = Path(__file__).resolve().parent  
-REF_STATS_PATH = BASE_DIR / "reference_stats.pkl"
+REF_STORE_DIR = BASE_DIR / "reference"
+PARITY_ROWS = 1000
+# Above this many records the vectorized pipeline beats the per-record
+# compiled scorer.
+COMPILED_MAX_BATCH = 64
+# Opt-in: with a wait above zero, concurrent /predict calls are coalesced
+# for up to that many milliseconds (or MICRO_BATCH_MAX requests) and
+# scored together.
+MICRO_BATCH_WAIT_MS = float(os.environ.get("PREDICT_BATCH_WAIT_MS", "0"))
+MICRO_BATCH_MAX = int(os.environ.get("PREDICT_BATCH_MAX", MAX_BATCH))
+# Opt-in: poll the registry every MODEL_POLL_SECONDS and hot-swap to the
+# newest version of the model (or the one MODEL_ALIAS points at).
+MODEL_POLL_SECONDS = float(os.environ.get("MODEL_POLL_SECONDS", "0"))
+MODEL_ALIAS = os.environ.get("MODEL_ALIAS") or None
+batcher = None
+ready = False
+startup_timings: Dict[str, Union[float, str]] = {}
+prediction_window = FeatureWindow()
+executor = None
 try:
-    with open(REF_STATS_PATH, "rb") as f:
-        reference_stats = pickle.load(f)
+    reference_store = open_reference_store(REF_STORE_DIR)
 except Exception as e:
-    raise RuntimeError(f"Failed to load reference_stats.pkl: {e}")
+    raise RuntimeError(f"Failed to open reference store {REF_STORE_DIR}: {e}")
+reference_bins = reference_store.bins()
+drift_engine = reference_store.engine()
+drift_sketches = DriftSketches.from_reference_bins(reference_bins)
+category_tables = {
+    feature: category_scores(spec)
+    for feature, spec in reference_bins.items()
+    if spec["type"] == "categorical"
+}
 
 class CreditApplication(BaseModel):
     data: Dict[str, Union[float, int, str, None]]
@@ -32,75 +81,433 @@ class CreditApplication(BaseModel):
 class PredictionResponse(BaseModel):
     prediction: int
     probability: float
+    model_version: str
     drift: Dict[str, Dict[str, Union[float, bool]]]
 
 def detect_drift(input_data: dict):
-    drift_report = {}
+    """
+    Score each numeric field by where it falls in the reference distribution,
+    and each categorical field by how rare its category is in the reference.
+    """
+    return detect_drift_batch([input_data])[0]
 
-    for feature, value in input_data.items():
-        ref = reference_stats.get(feature)
+def detect_drift_batch(inputs: List[dict]):
+    """
+    detect_drift for every record of a batch in one vectorized lookup.
+    """
+    values = [
+        {
+            feature: value
+            for feature, value in input_data.items()
+            if value is not None and isinstance(value, (int, float))
+        }
+        for input_data in inputs
+    ]
 
-        if ref is None or value is None or not isinstance(value, (int, float)):
-            continue
-        ks_stat, p_value = ks_2samp(
-            ref["values"],
-            np.array([value, value])
-        )
+    reports = []
+    for scores in drift_engine.score_batch(values):
+        drift_report = {}
+        for feature, score in scores.items():
+            p_value = score["tail_probability"]
+            drift_report[feature] = {
+                "p_value": p_value,
+                "percentile": score["percentile"],
+                "drift_detected": p_value < 0.05
+            }
+        reports.append(drift_report)
 
-        drift_report[feature] = {
-            "p_value": float(p_value),
-            "drift_detected": p_value < 0.05
-        }
-    return drift_report
+    for input_data, drift_report in zip(inputs, reports):
+        for feature, value in input_data.items():
+            table = category_tables.get(feature)
+            if table is None or not isinstance(value, str):
+                continue
+            frequency, p_value = table.get(value, table[OTHER])
+            drift_report[feature] = {
+                "p_value": p_value,
+                "frequency": frequency,
+                "drift_detected": p_value < 0.05
+            }
+    return reports
+
+def build_input_frame(inputs: List[dict], model) -> pd.DataFrame:
+    """
+    One row per application over the model's input columns; fields the
+    model does not know are ignored and missing ones are NaN, which the
+    imputers recognise (None in an object column reads as a category).
+    """
+    feature_names = model.named_steps["preprocessor"].feature_names_in_
+    rows = []
+    for input_data in inputs:
+        row = []
+        for col in feature_names:
+            value = input_data.get(col)
+            row.append(np.nan if value is None else value)
+        rows.append(row)
+    return pd.DataFrame(rows, columns=feature_names, dtype=object)
+
+def predict_probabilities(
+    inputs: List[dict],
+    loaded: LoadedModel,
+    handler: str = "/predict"
+) -> np.ndarray:
+    scorer = loaded.scorer
+    if scorer is not None and len(inputs) <= COMPILED_MAX_BATCH:
+        try:
+            with metrics.stage(handler, "score_compiled"):
+                probs = scorer.score_batch(inputs)
+            metrics.PREDICTIONS.inc(len(inputs), scorer="compiled")
+            return probs
+        except (TypeError, ValueError):
+            pass
+    with metrics.stage(handler, "build_frame"):
+        frame = build_input_frame(inputs, loaded.model)
+    with metrics.stage(handler, "predict_proba"):
+        probs = loaded.model.predict_proba(frame)[:, 1]
+    metrics.PREDICTIONS.inc(len(inputs), scorer="pipeline")
+    return probs
+
+def warm_up_model(loaded: LoadedModel):
+    """
+    One unlogged prediction through both scoring paths and the drift check.
+    """
+    sample = warm_up_sample or {}
+    loaded.model.predict_proba(build_input_frame([sample], loaded.model))
+    if loaded.scorer is not None:
+        loaded.scorer.score_batch([sample])
+    detect_drift_batch([sample])
+
+model_manager = ModelManager(alias=MODEL_ALIAS, warm_up=warm_up_model)
+warm_up_sample = None
 
 @app.on_event("startup")
 def load_model():
-    global model
-    model = mlflow.sklearn.load_model(MODEL_URI)
+    global executor, batcher
+    started = time.perf_counter()
+    startup_timings["import"] = round(started - IMPORT_STARTED, 4)
+    loaded = model_manager.load(MODEL_URI, prepare=False)
+    model_manager.activate(loaded)
+    startup_timings["model_source"] = loaded.source
+    startup_timings["model_load"] = round(time.perf_counter() - started, 4)
+
+    migrate_legacy_log()
+    reload_window()
+    subscribe(prediction_window.append_records, on_reset=reload_window)
+    # Counting starts before /predict is served; the warm-up's rebuild
+    # recounts the log without losing or doubling rows logged meanwhile.
+    subscribe(drift_sketches.append_records, on_reset=drift_sketches.rebuild)
+    start_background_writer()
+    # Rows logged by other uvicorn workers reach the window and sketches.
+    start_follower()
+    executor = JobExecutor()
+    if MICRO_BATCH_WAIT_MS > 0:
+        batcher = MicroBatcher(
+            lambda inputs: score_applications(inputs, "/predict"),
+            max_batch=MICRO_BATCH_MAX,
+            max_wait_ms=MICRO_BATCH_WAIT_MS
+        )
+        batcher.start()
+    register_gauges()
+    # /predict is served from here on; /ready waits for the warm-up.
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+def warm_up():
+    """
+    Build what only speeds up or backs the drift endpoints (compiled
+    scorer, time-bucketed sketches), then warm up the startup model and
+    flip readiness.
+    """
+    global ready, warm_up_sample
+    started = time.perf_counter()
+    parity_data = None
+    if split_path("val").exists():
+        # Built the way /predict builds its inputs: plain floats and strings.
+        records = to_records(
+            load_split("val", nrows=PARITY_ROWS).drop(columns=["TARGET"], errors="ignore")
+        )
+        parity_data = pd.DataFrame(records)
+        if records:
+            warm_up_sample = records[0]
+    model_manager.parity_data = parity_data
+    drift_sketches.rebuild()
+
+    try:
+        model_manager.prepare(model_manager.current)
+    except Exception as e:
+        print(f"Warm-up prediction failed, not marking ready: {e}")
+        return
+
+    now = time.perf_counter()
+    startup_timings["warm_up"] = round(now - started, 4)
+    startup_timings["time_to_ready"] = round(now - IMPORT_STARTED, 4)
+    ready = True
+    print(f"Ready in {startup_timings['time_to_ready']}s: {startup_timings}")
+    if MODEL_POLL_SECONDS > 0:
+        model_manager.start_polling(MODEL_POLL_SECONDS)
+
+def register_gauges():
+    # Read at scrape time, so they cost nothing on the request path.
+    metrics.gauge(
+        "drift_api_prediction_log_rows",
+        "Rows in the persisted prediction log, including the write buffer.",
+        count_predictions
+    )
+    metrics.gauge(
+        "drift_api_window_rows",
+        "Predictions held in the in-memory drift window.",
+        lambda: len(prediction_window)
+    )
+    metrics.gauge(
+        "drift_api_window_capacity",
+        "Capacity of the in-memory drift window.",
+        lambda: prediction_window.capacity
+    )
+    metrics.gauge(
+        "drift_api_sketch_buckets",
+        "Time buckets held by the drift sketches.",
+        lambda: len(drift_sketches.buckets)
+    )
+    metrics.gauge(
+        "drift_api_log_writer",
+        "Background log writer counters and queue depth.",
+        lambda: {
+            (name,): value
+            for name, value in (writer_stats() or {}).items()
+        },
+        labels=["stat"]
+    )
+    metrics.gauge(
+        "drift_api_startup_seconds",
+        "Seconds spent in each cold-start phase.",
+        lambda: {
+            (phase,): value
+            for phase, value in startup_timings.items()
+            if isinstance(value, float)
+        },
+        labels=["phase"]
+    )
+
+def reload_window():
+    prediction_window.load_frame(
+        read_predictions(last_n=prediction_window.capacity)
+    )
+
+@app.on_event("shutdown")
+def flush_prediction_log():
+    model_manager.stop_polling()
+    if batcher is not None:
+        batcher.stop()
+    stop_follower()
+    stop_background_writer()
+    flush()
+    if executor is not None:
+        executor.shutdown()
+
+def retraining_outcome(result: dict) -> str:
+    return result.get("training_status") or result.get("action", "unknown")
+
+def on_retraining_done(job: dict):
+    result = job.get("result") or {}
+    metrics.RETRAINING.inc(
+        outcome=retraining_outcome(result) if job["status"] == "done"
+        else f"job_{job['status']}"
+    )
+    if job.get("started_at") and job.get("finished_at"):
+        metrics.RETRAINING_SECONDS.observe((
+            datetime.fromisoformat(job["finished_at"])
+            - datetime.fromisoformat(job["started_at"])
+        ).total_seconds())
+    # The worker process cleared the persisted log; resync the window.
+    if result.get("logs_cleared"):
+        reload_window()
+        drift_sketches.rebuild()
+
+def _metric_selection(metric: Optional[str]) -> Optional[Dict[str, str]]:
+    # One metric for every feature it applies to; the rest keep their default.
+    if metric is None:
+        return None
+    known = sorted(set(NUMERIC_METRICS) | set(CATEGORICAL_METRICS))
+    if metric not in known:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown drift metric {metric!r}; expected one of {known}"
+        )
+    return {"numeric": metric, "categorical": metric}
 
 @app.get("/drift/report")
-def drift_report(samples: int = 100):
-    return aggregate_drift(samples)
+def drift_report(samples: int = 100, metric: Optional[str] = None):
+    from src.drift.analyzer import aggregate_drift
+
+    metrics.DRIFT_CHECKS.inc(handler="/drift/report")
+    with metrics.stage("/drift/report", "aggregate_drift"):
+        return aggregate_drift(
+            samples, prediction_window, _metric_selection(metric)
+        )
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # Logged timestamps are naive UTC.
+    if value is None or value.tzinfo is None:
+        return value
+    return pd.Timestamp(value).tz_convert("UTC").tz_localize(None).to_pydatetime()
+
+@app.get("/drift/range")
+def drift_range(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    compare_from: Optional[datetime] = None,
+    compare_to: Optional[datetime] = None
+):
+    """
+    Drift of the predictions between from and to (whole time buckets)
+    against the reference, or against compare_from/compare_to when given.
+    """
+    metrics.DRIFT_CHECKS.inc(handler="/drift/range")
+    with metrics.stage("/drift/range", "range_drift"):
+        return drift_sketches.range_drift(
+            _utc_naive(start),
+            _utc_naive(end),
+            _utc_naive(compare_from),
+            _utc_naive(compare_to)
+        )
 
 @app.get("/drift/alerts")
-def drift_alerts(window_size: int = 100):
-    drift_summary = aggregate_drift(window_size)
-    alert_report = generate_alert(drift_summary)
-    response_action = drift_action_handler(
-        drift_ratio=drift_summary.get("drift_ratio", 0.0),
-        alert_status=alert_report.get("status", "no_alert")
-    )
-    build_retraining_data(min_samples=window_size)
+def drift_alerts(window_size: int = 100, metric: Optional[str] = None):
+    from src.drift.analyzer import aggregate_drift
+    from src.drift.alerting import generate_alert
+    from src.inference.drift_response import drift_action_handler
+
+    handler = "/drift/alerts"
+    metrics.DRIFT_CHECKS.inc(handler=handler)
+    with metrics.stage(handler, "aggregate_drift"):
+        drift_summary = aggregate_drift(
+            window_size, prediction_window, _metric_selection(metric)
+        )
+    with metrics.stage(handler, "generate_alert"):
+        alert_report = generate_alert(drift_summary)
+    alerts = alert_report.get("alerts") or [{"severity": "NONE"}]
+    metrics.ALERTS.inc(severity=alerts[0]["severity"])
+
+    # Without an executor, retraining runs inline in this stage.
+    with metrics.stage(handler, "drift_action_handler"):
+        response_action = drift_action_handler(
+            drift_ratio=drift_summary.get("drift_ratio", 0.0),
+            alert_status=alert_report.get("status", "no_alert"),
+            executor=executor,
+            on_retraining_done=on_retraining_done
+        )
+    if response_action["action"] in (
+        "retraining_triggered", "retraining_skipped", "retraining_failed"
+    ):
+        metrics.RETRAINING.inc(outcome=retraining_outcome(response_action))
     return {
         "drift_summary": drift_summary,
         "alert_report": alert_report,
         "response_action": response_action
     }
 
+def score_applications(inputs: List[dict], handler: str) -> List[dict]:
+    """
+    Score, drift-check and log a batch of inputs; one response per input.
+    """
+    # Read once, so a concurrent swap cannot split a batch across models.
+    loaded = model_manager.current
+    probs = predict_probabilities(inputs, loaded, handler)
+    predictions = [int(prob >= 0.5) for prob in probs]
+    probabilities = [float(prob) for prob in probs]
+
+    with metrics.stage(handler, "detect_drift"):
+        drifts = detect_drift_batch(inputs)
+    with metrics.stage(handler, "log_prediction"):
+        log_predictions(inputs, predictions, probabilities, loaded.version)
+    return [
+        {
+            "prediction": prediction,
+            "probability": probability,
+            "model_version": loaded.version,
+            "drift": drift
+        }
+        for prediction, probability, drift in zip(
+            predictions, probabilities, drifts
+        )
+    ]
+
 @app.post("/predict", response_model=PredictionResponse)
 def predict(application: CreditApplication):
-    preprocessor = model.named_steps["preprocessor"]
-    feature_names = preprocessor.feature_names_in_
-
-    input_df = pd.DataFrame([{col: None for col in feature_names}])
-    for key, value in application.data.items():
-        if key in input_df.columns:
-            input_df.at[0, key] = value
-    prob = model.predict_proba(input_df)[0, 1]
-    prediction = int(prob >= 0.5)
-
-    drift = detect_drift(application.data)
-    log_prediction(
-        input_data=application.data,
-        prediction=prediction,
-        probability=float(prob)
-    )
-    return {
-        "prediction": prediction,
-        "probability": float(prob),
-        "drift": drift
-    }
+    if batcher is not None:
+        return batcher.submit(application.data).result()
+    return score_applications([application.data], "/predict")[0]
+
+@app.post("/predict/batch", response_model=List[PredictionResponse])
+def predict_batch(applications: List[CreditApplication]):
+    inputs = [application.data for application in applications]
+    if not inputs:
+        return []
+    return score_applications(inputs, "/predict/batch")
 
 @app.get("/drift/tree")
-def tree_drift(window_size: int = 200):
-    return tree_based_drift(window_size)
\ No newline at end of file
+def tree_drift(
+    window_size: int = 200,
+    time_budget: Optional[float] = None,
+    background: bool = False
+):
+    from src.drift.tree_drift import tree_based_drift, TIME_BUDGET
+
+    if time_budget is None:
+        time_budget = TIME_BUDGET
+    if background:
+        return {
+            "status": "queued",
+            "job": executor.submit(
+                "tree_drift", tree_based_drift, window_size, time_budget
+            )
+        }
+    return tree_based_drift(window_size, time_budget)
+
+@app.get("/model")
+def model_info():
+    return model_manager.describe()
+
+@app.post("/model/refresh")
+def refresh_model():
+    """
+    Check the registry now (e.g. from a promotion hook) and hot-swap if a
+    new version is there.
+    """
+    try:
+        return model_manager.refresh()
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Model refresh failed: {e}")
+
+@app.post("/model/rollback")
+def rollback_model():
+    try:
+        model_manager.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return model_manager.describe()
+
+@app.get("/ready")
+def readiness():
+    """
+    503 until the startup warm-up prediction has run, then the cold-start
+    timings.
+    """
+    if not ready:
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready", "startup": startup_timings}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/jobs")
+def list_jobs(limit: int = 50):
+    return executor.list(limit)
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = executor.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
\ No newline at end of file
@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+from src.monitoring import metrics
+
+MAX_BATCH = 32
+MAX_WAIT_MS = 2.0
+
+BATCH_SIZE = metrics.REGISTRY.register(metrics.Histogram(
+    "drift_api_micro_batch_size",
+    "Requests coalesced into each micro-batch.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+))
+QUEUE_WAIT_SECONDS = metrics.REGISTRY.register(metrics.Histogram(
+    "drift_api_micro_batch_wait_seconds",
+    "Time a request waited in the micro-batch queue before scoring."
+))
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-record requests into batches.
+
+    submit() queues one input and returns a future. A daemon thread takes
+    the first waiting input, keeps collecting for up to max_wait_ms or
+    until max_batch inputs are in hand, and passes them to handle_batch
+    in one call; each future then gets its own entry of the returned list.
+    If handle_batch raises on a batch, each input is retried on its own so
+    that only the requests that fail by themselves get an exception.
+    """
+
+    def __init__(
+        self,
+        handle_batch: Callable[[List], List],
+        max_batch: int = MAX_BATCH,
+        max_wait_ms: float = MAX_WAIT_MS
+    ):
+        self.handle_batch = handle_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="predict-micro-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self.queue.put((item, future, time.perf_counter()))
+        return future
+
+    def stop(self, timeout: float = 30):
+        # Queued behind every accepted request, which is scored first.
+        self.queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            deadline = time.perf_counter() + self.max_wait
+            stopping = False
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    entry = (
+                        self.queue.get(timeout=remaining) if remaining > 0
+                        else self.queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            self._score(batch)
+            if stopping:
+                return
+
+    def _score(self, batch: List[tuple]):
+        started = time.perf_counter()
+        BATCH_SIZE.observe(len(batch))
+        for _, _, queued in batch:
+            QUEUE_WAIT_SECONDS.observe(started - queued)
+
+        try:
+            results = self.handle_batch([item for item, _, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            for entry in batch:
+                self._score([entry])
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
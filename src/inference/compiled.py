@@ -0,0 +1,187 @@
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+PARITY_TOLERANCE = 1e-6
+
+
+class NotCompilable(Exception):
+    pass
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class CompiledScorer:
+    """
+    Single-record scorer for an imputer/scaler/one-hot + logistic regression
+    pipeline, folded into one intercept and per-feature weights.
+
+    Every term is expressed relative to the imputed value, so a missing
+    field contributes nothing and a present one adds a single product
+    (numeric) or a dictionary lookup (categorical).
+    """
+
+    def __init__(
+        self,
+        base: float,
+        numeric: Dict[str, Tuple[float, float]],
+        categorical: Dict[str, Tuple[Dict[str, float], float]]
+    ):
+        self.base = base
+        self.numeric = numeric
+        self.categorical = categorical
+
+    def decision_function(self, input_data: dict) -> float:
+        z = self.base
+        for key, value in input_data.items():
+            if _is_missing(value):
+                continue
+            entry = self.numeric.get(key)
+            if entry is not None:
+                z += entry[0] * (float(value) - entry[1])
+                continue
+            entry = self.categorical.get(key)
+            if entry is not None:
+                # Unknown categories encode to all zeros, like the encoder's
+                # handle_unknown="ignore".
+                z += entry[0].get(value, 0.0) - entry[1]
+        return z
+
+    def score(self, input_data: dict) -> float:
+        z = self.decision_function(input_data)
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+    def score_batch(self, inputs: List[dict]) -> np.ndarray:
+        return np.array([self.score(input_data) for input_data in inputs])
+
+
+def _unwrap(step):
+    if isinstance(step, Pipeline):
+        return [s for _, s in step.steps if s != "passthrough"]
+    return [step]
+
+
+def compile_pipeline(pipeline: Pipeline) -> CompiledScorer:
+    """
+    Fold a fitted Pipeline(ColumnTransformer, LogisticRegression) into a
+    CompiledScorer. Raises NotCompilable for any other shape.
+    """
+    if not isinstance(pipeline, Pipeline) or len(pipeline.steps) != 2:
+        raise NotCompilable("expected a two-step pipeline")
+    preprocessor = pipeline.steps[0][1]
+    classifier = pipeline.steps[1][1]
+    if not isinstance(preprocessor, ColumnTransformer):
+        raise NotCompilable("first step is not a ColumnTransformer")
+    if not isinstance(classifier, LogisticRegression):
+        raise NotCompilable("classifier is not a LogisticRegression")
+    if len(classifier.classes_) != 2:
+        raise NotCompilable("classifier is not binary")
+
+    coef = classifier.coef_[0]
+    base = float(classifier.intercept_[0])
+    numeric, categorical = {}, {}
+    offset = 0
+
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or len(columns) == 0:
+            continue
+        if transformer == "passthrough":
+            raise NotCompilable(f"{name}: passthrough columns")
+
+        steps = _unwrap(transformer)
+        imputer = steps[0]
+        if not isinstance(imputer, SimpleImputer) or imputer.add_indicator:
+            raise NotCompilable(f"{name}: expected a SimpleImputer first")
+
+        # SimpleImputer drops columns it could not learn a statistic for.
+        kept = [
+            (col, stat)
+            for col, stat in zip(columns, imputer.statistics_)
+            if not _is_missing(stat) or imputer.keep_empty_features
+        ]
+
+        if len(steps) == 2 and isinstance(steps[1], StandardScaler):
+            scaler = steps[1]
+            mean = scaler.mean_ if scaler.with_mean else np.zeros(len(kept))
+            scale = scaler.scale_ if scaler.with_std else np.ones(len(kept))
+            weights = coef[offset:offset + len(kept)]
+            for (col, median), w, mu, sd in zip(kept, weights, mean, scale):
+                median = float(median)
+                numeric[col] = (float(w / sd), median)
+                base += float(w * (median - mu) / sd)
+            offset += len(kept)
+
+        elif len(steps) == 2 and isinstance(steps[1], OneHotEncoder):
+            encoder = steps[1]
+            if encoder.drop_idx_ is not None:
+                raise NotCompilable(f"{name}: encoder drops categories")
+            if any(c is not None for c in
+                   getattr(encoder, "infrequent_categories_", [None])):
+                raise NotCompilable(f"{name}: infrequent categories")
+            for (col, fill), categories in zip(kept, encoder.categories_):
+                weights = coef[offset:offset + len(categories)]
+                table = {c: float(w) for c, w in zip(categories, weights)}
+                fill_weight = table.get(fill, 0.0)
+                categorical[col] = (table, fill_weight)
+                base += fill_weight
+                offset += len(categories)
+
+        else:
+            raise NotCompilable(f"{name}: unsupported transformer")
+
+    if offset != len(coef):
+        raise NotCompilable(
+            f"folded {offset} weights but the classifier has {len(coef)}"
+        )
+
+    return CompiledScorer(base, numeric, categorical)
+
+
+def check_parity(
+    scorer: CompiledScorer,
+    pipeline: Pipeline,
+    X: pd.DataFrame
+) -> float:
+    """
+    Largest absolute difference between compiled and pipeline probabilities.
+    """
+    expected = pipeline.predict_proba(X)[:, 1]
+    inputs = X.astype(object).where(X.notna(), None).to_dict("records")
+    return float(np.max(np.abs(scorer.score_batch(inputs) - expected)))
+
+
+def load_compiled_scorer(
+    pipeline: Pipeline,
+    parity_data: Optional[pd.DataFrame] = None
+) -> Optional[CompiledScorer]:
+    """
+    Compiled scorer for pipeline, or None when the model is not of the
+    supported shape, there is no parity_data to check it on, or it
+    disagrees with the pipeline on parity_data.
+    """
+    if parity_data is None or not len(parity_data):
+        print("Compiled scorer disabled: no parity data to check it against")
+        return None
+    try:
+        scorer = compile_pipeline(pipeline)
+    except NotCompilable as e:
+        print(f"Compiled scorer disabled: {e}")
+        return None
+
+    diff = check_parity(scorer, pipeline, parity_data)
+    if diff > PARITY_TOLERANCE:
+        print(f"Compiled scorer disabled: parity diff {diff:.2e}")
+        return None
+    print(f"Compiled scorer enabled (parity diff {diff:.2e})")
+    return scorer
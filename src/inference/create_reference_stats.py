@@ -1,27 +1,158 @@
-import pickle
+"""
+Build the drift reference store from the training data, streaming the
+split (Parquet record batches, or CSV chunks for older splits) so the
+dataset never has to fit in memory:
+
+    python -m src.inference.create_reference_stats --train data/processed/train.parquet
+"""
+import argparse
+import tempfile
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from src.data.loader import iter_split_batches, split_path
+from src.drift.reference_store import ReferenceStoreWriter
 
-df = pd.read_csv(r"D:\College\Data Drift Detection\data\processed\train.csv")  
-
-numeric_df = df.select_dtypes(include=["int64", "float64"])
+BASE_DIR = Path(__file__).resolve().parent
+STORE_DIR = BASE_DIR / "reference"
+SAMPLE_PATH = BASE_DIR / "reference_sample.parquet"
 
-reference_stats = {}
+CHUNK_ROWS = 100000
+# Rows read up front to fix every column's dtype for the whole stream.
+DTYPE_SAMPLE_ROWS = 10000
+SAMPLE_ROWS = 5000
 
-for col in numeric_df.columns:
-    values = numeric_df[col].dropna().values
 
-    if len(values) == 0:
-        continue
-    reference_stats[col] = {
-        "values": numeric_df[col].dropna().values
+def infer_dtypes(train_path: Path, drop: List[str]) -> Dict[str, str]:
+    """
+    float64 for numeric columns and object for everything else, decided
+    once so that no chunk is parsed with a different dtype. Parquet splits
+    carry their schema, so only CSVs are sampled.
+    """
+    if train_path.suffix == ".parquet":
+        return {
+            field.name: "float64" if pa.types.is_integer(field.type)
+            or pa.types.is_floating(field.type) else "object"
+            for field in pq.read_schema(train_path)
+            if field.name not in drop
+        }
+    head = pd.read_csv(train_path, nrows=DTYPE_SAMPLE_ROWS)
+    return {
+        col: "float64" if pd.api.types.is_numeric_dtype(head[col]) else "object"
+        for col in head.columns
+        if col not in drop
     }
 
-BASE_DIR = Path(__file__).resolve().parent
-output_path = BASE_DIR / "reference_stats.pkl"
 
-with open(output_path, "wb") as f:
-    pickle.dump(reference_stats, f)
+def read_chunks(
+    train_path: Path,
+    dtypes: Dict[str, str],
+    chunk_rows: int
+) -> Iterator[pd.DataFrame]:
+    """
+    The columns of dtypes, chunk_rows rows at a time, cast to dtypes.
+    """
+    if train_path.suffix == ".parquet":
+        for chunk in iter_split_batches(train_path, list(dtypes), chunk_rows):
+            yield chunk.astype(dtypes)
+        return
+    yield from pd.read_csv(
+        train_path,
+        dtype=dtypes,
+        usecols=list(dtypes),
+        chunksize=chunk_rows
+    )
+
+
+def build_reference(
+    train_path: Optional[Path] = None,
+    store_dir: Path = STORE_DIR,
+    sample_path: Path = SAMPLE_PATH,
+    chunk_rows: int = CHUNK_ROWS,
+    drop: List[str] = ()
+):
+    """
+    Stream train_path once, spilling each numeric column's values to its
+    own temporary file and counting categories, then sort and write one
+    feature at a time. Peak memory is one chunk plus the largest column.
+    Defaults to the processed train split.
+    """
+    train_path = train_path or split_path("train")
+    dtypes = infer_dtypes(train_path, list(drop))
+    numeric = [c for c, dtype in dtypes.items() if dtype == "float64"]
+    categorical = [c for c, dtype in dtypes.items() if dtype == "object"]
+
+    store_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(42)
+    missing = dict.fromkeys(numeric + categorical, 0)
+    frequencies = {c: pd.Series(dtype=np.int64) for c in categorical}
+    sample = None
+    rows = 0
+
+    with tempfile.TemporaryDirectory(dir=store_dir) as spill_dir:
+        spill_paths = {c: Path(spill_dir) / f"{i}.f64" for i, c in enumerate(numeric)}
+        spills = {c: open(p, "wb") for c, p in spill_paths.items()}
+
+        for chunk in read_chunks(train_path, dtypes, chunk_rows):
+            rows += len(chunk)
+            for col in numeric:
+                values = chunk[col].to_numpy(dtype="<f8", na_value=np.nan)
+                present = ~np.isnan(values)
+                missing[col] += int(len(values) - present.sum())
+                spills[col].write(values[present].tobytes())
+            for col in categorical:
+                missing[col] += int(chunk[col].isna().sum())
+                frequencies[col] = frequencies[col].add(
+                    chunk[col].value_counts(), fill_value=0
+                )
+
+            # Uniform sample of whole rows: keep the SAMPLE_ROWS rows with
+            # the smallest random keys seen so far.
+            keyed = chunk[numeric].assign(_key=rng.random(len(chunk)))
+            if sample is not None:
+                keyed = pd.concat([sample, keyed])
+            sample = keyed.nsmallest(SAMPLE_ROWS, "_key")
+
+        for spill in spills.values():
+            spill.close()
+
+        writer = ReferenceStoreWriter(store_dir)
+        for col in numeric:
+            writer.add_numeric(
+                col, np.fromfile(spill_paths[col], dtype="<f8"), missing[col]
+            )
+            spill_paths[col].unlink()
+        for col in categorical:
+            if frequencies[col].sum() > 0:
+                writer.add_categorical(
+                    col, frequencies[col].astype(np.int64), missing[col]
+                )
+        writer.close(rows)
+
+    sample.drop(columns="_key").reset_index(drop=True).to_parquet(
+        sample_path, index=False
+    )
+    print(f"Reference store written to {store_dir} ({rows} rows)")
+    print(f"Numeric features: {len(writer.numeric)}, "
+          f"categorical features: {len(writer.categorical)}")
+    print(f"Reference sample written to {sample_path}")
+
 
-print("reference_stats.pkl created successfully")
-print(f"Total features stored: {len(reference_stats)}")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--train", type=Path, default=None,
+        help="training split (default: data/processed/train.parquet, else .csv)"
+    )
+    parser.add_argument("--out", type=Path, default=STORE_DIR)
+    parser.add_argument("--sample", type=Path, default=SAMPLE_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument(
+        "--drop", nargs="*", default=[],
+        help="columns to leave out of the reference, e.g. TARGET SK_ID_CURR"
+    )
+    args = parser.parse_args()
+    build_reference(args.train, args.out, args.sample, args.chunk_rows, args.drop)
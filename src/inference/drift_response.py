@@ -1,7 +1,23 @@
 from datetime import datetime
-from src.retraining.trigger import save_retraining_data, trigger_retraining_job
+from typing import Callable
+from src.jobs.executor import JobExecutor
+from src.retraining.trigger import (
+    retraining_mode,
+    save_retraining_data,
+    trigger_retraining_job
+)
 
-def drift_action_handler(drift_ratio: float, alert_status: str):
+def drift_action_handler(
+    drift_ratio: float,
+    alert_status: str,
+    executor: JobExecutor = None,
+    on_retraining_done: Callable[[dict], None] = None
+):
+    """
+    Decide the response to a drift alert. With an executor, retraining is
+    queued as a background job (at most one at a time) and the job handle
+    is returned instead of waiting for it.
+    """
     if alert_status != "alert":
         return {
             "action": "no_action",
@@ -17,15 +33,44 @@ def drift_action_handler(drift_ratio: float, alert_status: str):
             "action": "notify_and_prepare_retraining",
             "reason": "Moderate drift detected"
         }
+    if executor is None:
+        return run_retraining(window_size=200, drift_ratio=drift_ratio)
+
+    job = executor.submit(
+        "retraining",
+        run_retraining,
+        window_size=200,
+        drift_ratio=drift_ratio,
+        exclusive=True,
+        on_done=on_retraining_done
+    )
+    return {
+        "action": "retraining_queued",
+        "reason": "Severe drift detected",
+        "job": job
+    }
+
+
+def run_retraining(window_size: int = 200, drift_ratio: float = None):
+    """
+    Export retraining data and run the retraining job, warm-started from
+    the production model unless drift_ratio calls for a full retrain.
+    Safe to run in a worker process.
+    """
+    # Only rows logged before the export are cleared after training.
+    logged_before = datetime.utcnow()
     try:
-        retrain_data_path = save_retraining_data(window_size=200, clear_logs=False)
+        retrain_data_path = save_retraining_data(window_size=window_size, clear_logs=False)
         print(f"Triggering retraining job with data from: {retrain_data_path}")
-        trigger_retraining_job(retrain_data_path)
+        training = trigger_retraining_job(
+            retrain_data_path, logged_before, retraining_mode(drift_ratio)
+        )
         
         return {
             "action": "retraining_triggered",
             "reason": "Severe drift detected",
-            "retrain_data_path": retrain_data_path
+            "retrain_data_path": retrain_data_path,
+            **training
         }
         
     except ValueError as e:
@@ -39,4 +84,4 @@ def drift_action_handler(drift_ratio: float, alert_status: str):
         return {
             "action": "retraining_failed",
             "reason": f"Unexpected error: {str(e)}"
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,125 @@
+"""
+Local, content-addressed cache of models loaded from MLflow.
+
+    models/cache/<sha256>.joblib       the pickled model, named by its digest
+    models/cache/refs/<sha256>.json    model URI -> digest (and sklearn version)
+
+Only URIs that always resolve to the same model are cached: runs:/ URIs and
+numbered model versions. A cache hit loads the joblib file directly, without
+importing mlflow or contacting the tracking store.
+"""
+import hashlib
+import io
+import json
+import os
+import joblib
+import sklearn
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+MODEL_CACHE_DIR = Path("models/cache")
+
+
+def is_immutable(model_uri: str) -> bool:
+    """
+    Whether model_uri always names the same model. Stages, aliases and
+    "latest" move as new versions are registered.
+    """
+    if model_uri.startswith("runs:/"):
+        return True
+    if model_uri.startswith("models:/"):
+        parts = model_uri[len("models:/"):].split("/")
+        return len(parts) == 2 and parts[1].isdigit()
+    return False
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _ref_path(model_uri: str, cache_dir: Path) -> Path:
+    return cache_dir / "refs" / f"{_digest(model_uri.encode())}.json"
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def load_cached(model_uri: str, cache_dir: Path = MODEL_CACHE_DIR) -> Optional[Any]:
+    """
+    The cached model for model_uri, or None when it is missing, fails its
+    digest check or was pickled by another scikit-learn version.
+    """
+    ref_path = _ref_path(model_uri, cache_dir)
+    if not ref_path.exists():
+        return None
+    with open(ref_path) as f:
+        ref = json.load(f)
+    if ref.get("sklearn_version") != sklearn.__version__:
+        print(f"Model cache for {model_uri} was written by scikit-learn "
+              f"{ref.get('sklearn_version')}, ignoring it")
+        return None
+
+    path = cache_dir / f"{ref['sha256']}.joblib"
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    if _digest(data) != ref["sha256"]:
+        print(f"Model cache entry {path} is corrupt, ignoring it")
+        return None
+    try:
+        return joblib.load(io.BytesIO(data))
+    except Exception as e:
+        print(f"Could not load cached model {path}: {e}")
+        return None
+
+
+def store(model_uri: str, model: Any, cache_dir: Path = MODEL_CACHE_DIR) -> Path:
+    """
+    Add model to the cache under model_uri and return its artifact path.
+    """
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    data = buffer.getvalue()
+    digest = _digest(data)
+
+    path = cache_dir / f"{digest}.joblib"
+    if not path.exists():
+        _write_atomic(path, data)
+    ref = {
+        "model_uri": model_uri,
+        "sha256": digest,
+        "sklearn_version": sklearn.__version__,
+        "cached_at": datetime.utcnow().isoformat()
+    }
+    _write_atomic(_ref_path(model_uri, cache_dir), json.dumps(ref, indent=2).encode())
+    return path
+
+
+def load_model(model_uri: str, cache_dir: Path = MODEL_CACHE_DIR) -> Tuple[Any, str]:
+    """
+    Load model_uri from the local cache when possible, otherwise through
+    MLflow (caching the result). Returns (model, "cache" or "mlflow").
+    """
+    cacheable = is_immutable(model_uri)
+    if cacheable:
+        model = load_cached(model_uri, cache_dir)
+        if model is not None:
+            return model, "cache"
+
+    import mlflow.sklearn
+
+    model = mlflow.sklearn.load_model(model_uri)
+    if cacheable:
+        try:
+            path = store(model_uri, model, cache_dir)
+            print(f"Cached {model_uri} at {path}")
+        except OSError as e:
+            print(f"Could not cache {model_uri}: {e}")
+    return model, "mlflow"
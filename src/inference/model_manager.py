@@ -0,0 +1,202 @@
+import threading
+import pandas as pd
+from datetime import datetime
+from typing import Callable, List, Optional, Set
+from src.inference import model_cache
+from src.inference.compiled import load_compiled_scorer
+
+MODEL_NAME = "credit_default_model"
+POLL_SECONDS = 60
+# Models kept in memory for rollback, besides the active one.
+HISTORY = 2
+
+
+def version_label(model_uri: str) -> str:
+    """
+    Version recorded with each prediction: the registry version number
+    for models:/name/N URIs, the URI itself otherwise.
+    """
+    if model_uri.startswith("models:/"):
+        parts = model_uri[len("models:/"):].split("/")
+        if len(parts) == 2 and parts[1].isdigit():
+            return parts[1]
+    return model_uri
+
+
+class LoadedModel:
+    """
+    A model and its compiled scorer, swapped in and out as one reference.
+    """
+
+    def __init__(self, model, model_uri: str, source: str, scorer=None):
+        self.model = model
+        self.model_uri = model_uri
+        self.version = version_label(model_uri)
+        self.source = source
+        self.scorer = scorer
+        self.loaded_at = datetime.utcnow()
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "model_uri": self.model_uri,
+            "source": self.source,
+            "compiled_scorer": self.scorer is not None,
+            "loaded_at": self.loaded_at.isoformat()
+        }
+
+
+class ModelManager:
+    """
+    Holds the active model and swaps in new registry versions without a
+    restart.
+
+    Requests read `current` once and use that LoadedModel to the end, so a
+    swap only changes what the next request sees. A new version is loaded,
+    compiled and warmed up off the request path before it is activated;
+    the models it replaces stay in memory so a rollback is just another
+    swap. Versions rolled back from are not promoted again by refresh().
+    refresh() and rollback() run one at a time, so the poller and the
+    endpoints cannot load and activate the same version twice.
+    """
+
+    def __init__(
+        self,
+        name: str = MODEL_NAME,
+        alias: Optional[str] = None,
+        warm_up: Callable[[LoadedModel], None] = None,
+        history: int = HISTORY
+    ):
+        self.name = name
+        self.alias = alias
+        self.warm_up = warm_up
+        self.history = history
+        self.parity_data: Optional[pd.DataFrame] = None
+        self.current: Optional[LoadedModel] = None
+        self.previous: List[LoadedModel] = []
+        self.rolled_back: Set[str] = set()
+        self._swap_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self, model_uri: str, prepare: bool = True) -> LoadedModel:
+        model, source = model_cache.load_model(model_uri)
+        loaded = LoadedModel(model, model_uri, source)
+        if prepare:
+            self.prepare(loaded)
+        return loaded
+
+    def prepare(self, loaded: LoadedModel):
+        """
+        Compile the scorer and run the warm-up; raises if the warm-up fails.
+        """
+        loaded.scorer = load_compiled_scorer(loaded.model, self.parity_data)
+        if self.warm_up is not None:
+            self.warm_up(loaded)
+
+    def activate(self, loaded: LoadedModel):
+        with self._swap_lock:
+            if self.current is not None:
+                self.previous.append(self.current)
+                del self.previous[:-self.history]
+            self.current = loaded
+        print(f"Serving model version {loaded.version}")
+
+    def rollback(self) -> LoadedModel:
+        """
+        Reactivate the previously active model.
+        """
+        with self._refresh_lock, self._swap_lock:
+            if not self.previous:
+                raise ValueError("No previous model to roll back to")
+            rejected = self.current
+            self.rolled_back.add(rejected.version)
+            self.current = self.previous.pop()
+        print(f"Rolled back from {rejected.version} to {self.current.version}")
+        return self.current
+
+    def registry_version(self, model_uri: str) -> Optional[str]:
+        """
+        The registry version of self.name a model URI was registered as, so
+        a model loaded by run compares equal to the version refresh() finds.
+        None when there is none or the registry cannot be reached.
+        """
+        if not model_uri.startswith("runs:/"):
+            return None
+        run_id = model_uri[len("runs:/"):].split("/")[0]
+        try:
+            from mlflow.tracking import MlflowClient
+
+            versions = MlflowClient().search_model_versions(f"run_id='{run_id}'")
+        except Exception as e:
+            print(f"Could not resolve the registry version of {model_uri}: {e}")
+            return None
+        numbers = [int(v.version) for v in versions if v.name == self.name]
+        return str(max(numbers)) if numbers else None
+
+    def latest_version(self) -> Optional[str]:
+        """
+        The registry version to serve: the alias target when an alias is
+        set, otherwise the newest registered version.
+        """
+        from mlflow.tracking import MlflowClient
+
+        client = MlflowClient()
+        if self.alias:
+            return str(client.get_model_version_by_alias(self.name, self.alias).version)
+        versions = client.search_model_versions(f"name='{self.name}'")
+        if not versions:
+            return None
+        return str(max(int(v.version) for v in versions))
+
+    def refresh(self) -> dict:
+        """
+        Load, warm up and activate the registry's version if it is not the
+        one being served.
+        """
+        with self._refresh_lock:
+            version = self.latest_version()
+            if self.current is not None and not self.current.version.isdigit():
+                # Loaded by run at startup: label it by its registry version
+                # before comparing, or the first poll reloads the same model.
+                self.current.version = (
+                    self.registry_version(self.current.model_uri)
+                    or self.current.version
+                )
+            current = self.current.version if self.current is not None else None
+            if version is None or version == current:
+                return {"status": "unchanged", "version": current}
+            if version in self.rolled_back:
+                return {"status": "rolled_back", "version": current, "skipped": version}
+
+            loaded = self.load(f"models:/{self.name}/{version}")
+            self.activate(loaded)
+        return {"status": "swapped", "version": version, "previous": current}
+
+    def start_polling(self, interval: float = POLL_SECONDS):
+        self._thread = threading.Thread(
+            target=self._poll, args=(interval,), name="model-poller", daemon=True
+        )
+        self._thread.start()
+
+    def stop_polling(self, timeout: float = 30):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+
+    def _poll(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Model registry poll failed: {e}")
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "alias": self.alias,
+            "current": self.current.describe() if self.current else None,
+            "previous": [m.describe() for m in reversed(self.previous)],
+            "rolled_back": sorted(self.rolled_back)
+        }
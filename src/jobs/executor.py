@@ -0,0 +1,248 @@
+import json
+import multiprocessing
+import os
+import threading
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: exclusive jobs are deduplicated per process only
+    fcntl = None
+
+JOB_DIR = Path("logs/jobs")
+JOB_DIR.mkdir(parents=True, exist_ok=True)
+# Shared by every server worker: kind -> id of its queued or running
+# exclusive job, read and written under LOCK_FILE.
+EXCLUSIVE_FILE = JOB_DIR / "exclusive.state"
+LOCK_FILE = JOB_DIR / ".lock"
+
+MAX_WORKERS = 2
+FINAL_STATES = ("done", "failed", "cancelled", "interrupted")
+
+
+def _job_path(job_id: str) -> Path:
+    return JOB_DIR / f"{job_id}.json"
+
+
+def _persist(job: dict):
+    path = _job_path(job["id"])
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(job, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def _load(job_id: str) -> Optional[dict]:
+    try:
+        with open(_job_path(job_id)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+@contextmanager
+def _jobs_locked():
+    if fcntl is None:
+        yield
+        return
+    with open(LOCK_FILE, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _load_exclusive() -> Dict[str, str]:
+    try:
+        with open(EXCLUSIVE_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_exclusive(exclusive: Dict[str, str]):
+    tmp_path = EXCLUSIVE_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(exclusive, f)
+    os.replace(tmp_path, EXCLUSIVE_FILE)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_live(job: Optional[dict]) -> bool:
+    """
+    Whether job can still finish: not in a final state and the server
+    process that submitted it is still running.
+    """
+    return (
+        job is not None
+        and job["status"] not in FINAL_STATES
+        and _pid_alive(job.get("pid"))
+    )
+
+
+def _run_job(job: dict, fn: Callable, args: tuple, kwargs: dict):
+    """
+    Runs in the worker process; records the running state on disk so the
+    parent can report it.
+    """
+    job = {**job, "status": "running", "started_at": datetime.utcnow().isoformat()}
+    _persist(job)
+    return fn(*args, **kwargs)
+
+
+class JobExecutor:
+    """
+    Bounded process pool for slow work (drift checks, retraining) with job
+    IDs, queued/running/done states and results persisted under logs/jobs.
+
+    Jobs submitted with exclusive=True are deduplicated per kind across
+    all server workers: while one is queued or running, submitting another
+    returns the existing job. Each job records the pid of the process that
+    submitted it, so a restarting worker only marks the jobs of dead
+    processes as interrupted.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.max_workers = max_workers
+        self._pool = self._new_pool()
+        self._jobs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._mark_interrupted()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # Workers are spawned, not forked, so they do not inherit the
+        # server's threads and locks.
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _mark_interrupted(self):
+        # Jobs left unfinished by a process that is gone will never
+        # complete. A job carrying this process's own pid predates it (the
+        # pid was reused), since nothing has been submitted here yet.
+        with _jobs_locked():
+            for path in JOB_DIR.glob("*.json"):
+                job = _load(path.stem)
+                if job is None or job["status"] in FINAL_STATES:
+                    continue
+                if job.get("pid") == os.getpid() or not _is_live(job):
+                    job["status"] = "interrupted"
+                    _persist(job)
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable,
+        *args,
+        exclusive: bool = False,
+        on_done: Callable[[dict], None] = None,
+        **kwargs
+    ) -> dict:
+        with self._lock, _jobs_locked():
+            if exclusive:
+                shared = _load_exclusive()
+                existing = self.get(shared[kind]) if kind in shared else None
+                if _is_live(existing):
+                    return {**existing, "deduplicated": True}
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "kind": kind,
+                "pid": os.getpid(),
+                "status": "queued",
+                "submitted_at": datetime.utcnow().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+            self._jobs[job["id"]] = job
+            _persist(job)
+            if exclusive:
+                _save_exclusive({**shared, kind: job["id"]})
+
+        try:
+            future = self._pool.submit(_run_job, job, fn, args, kwargs)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool.
+            self._pool = self._new_pool()
+            future = self._pool.submit(_run_job, job, fn, args, kwargs)
+        future.add_done_callback(
+            lambda f: self._finish(job["id"], f, exclusive, on_done)
+        )
+        return dict(job)
+
+    def _finish(self, job_id: str, future, exclusive: bool, on_done):
+        with self._lock:
+            job = self._jobs[job_id]
+            started = _load(job_id) or {}
+            job["started_at"] = started.get("started_at")
+            job["finished_at"] = datetime.utcnow().isoformat()
+            if future.cancelled():
+                job["status"] = "cancelled"
+            elif future.exception() is not None:
+                error = future.exception()
+                job["status"] = "failed"
+                job["error"] = "".join(
+                    traceback.format_exception_only(type(error), error)
+                ).strip()
+            else:
+                job["status"] = "done"
+                job["result"] = future.result()
+            _persist(job)
+            if exclusive:
+                with _jobs_locked():
+                    shared = _load_exclusive()
+                    if shared.get(job["kind"]) == job_id:
+                        del shared[job["kind"]]
+                        _save_exclusive(shared)
+            finished = dict(job)
+
+        if on_done is not None:
+            try:
+                on_done(finished)
+            except Exception as e:
+                print(f"Job {job_id} callback failed: {e}")
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return _load(job_id)
+        job = dict(job)
+        if job["status"] == "queued":
+            on_disk = _load(job_id)
+            if on_disk is not None and on_disk["status"] == "running":
+                job.update(status="running", started_at=on_disk["started_at"])
+        return job
+
+    def list(self, limit: int = 50) -> List[dict]:
+        paths = sorted(
+            JOB_DIR.glob("*.json"),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True
+        )[:limit]
+        jobs = [self.get(path.stem) for path in paths]
+        return [job for job in jobs if job is not None]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
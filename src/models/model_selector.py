@@ -1,21 +1,114 @@
-import mlflow
-import mlflow.sklearn
-import pandas as pd
+import hashlib
+import json
+import os
+from joblib import Parallel, delayed
 from pathlib import Path
+from typing import List, Optional
 from sklearn.metrics import roc_auc_score, precision_recall_curve, auc, f1_score
+from src.data.loader import load_xy, split_path
+from src.inference import model_cache
 
 DATA_PATH = Path("data/processed")
 TARGET = "TARGET"
-
-
-def load_validation_data():
-    df = pd.read_csv(DATA_PATH / "val.csv")
-    X = df.drop(columns=[TARGET])
-    y = df[TARGET]
-    return X, y
+# Production metrics per (model run, validation set), shared by processes.
+METRICS_CACHE_DIR = Path("models/cache/metrics")
+
+# (path, size, mtime) -> content hash, and the parsed validation frames of
+# the current hash keyed by the columns read.
+_hashes = {}
+_validation_cache = {}
+
+
+def validation_hash() -> str:
+    """
+    sha256 of the validation split file, recomputed only when it changes.
+    """
+    path = split_path("val", DATA_PATH)
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _hashes.clear()
+        _hashes[key] = digest.hexdigest()
+    return _hashes[key]
+
+
+def load_validation_data(columns=None):
+    """
+    Validation features and target; columns limits the features read.
+    Parsed frames are kept in memory until the file changes.
+    """
+    key = (validation_hash(), tuple(columns) if columns is not None else None)
+    if key not in _validation_cache:
+        if any(k[0] != key[0] for k in _validation_cache):
+            _validation_cache.clear()
+        _validation_cache[key] = load_xy("val", columns, data_dir=DATA_PATH)
+    return _validation_cache[key]
+
+
+def model_run_id(model_uri: str) -> Optional[str]:
+    """
+    The MLflow run that produced model_uri, for runs:/ URIs and numbered
+    registry versions; None for URIs that can move.
+    """
+    if not model_cache.is_immutable(model_uri):
+        return None
+    if model_uri.startswith("runs:/"):
+        return model_uri[len("runs:/"):].split("/")[0]
+    from mlflow.tracking import MlflowClient
+
+    name, version = model_uri[len("models:/"):].split("/")
+    return MlflowClient().get_model_version(name, version).run_id
+
+
+def _metrics_key(model_uri: str, val_hash: str) -> Optional[str]:
+    run_id = model_run_id(model_uri)
+    if run_id is None:
+        return None
+    return hashlib.sha256(f"{run_id}:{val_hash}".encode()).hexdigest()
+
+
+def _cached_metrics(key: Optional[str]) -> Optional[dict]:
+    if key is None:
+        return None
+    try:
+        with open(METRICS_CACHE_DIR / f"{key}.json") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _store_metrics(key: Optional[str], metrics: dict):
+    if key is None:
+        return
+    METRICS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = METRICS_CACHE_DIR / f"{key}.json"
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(metrics, f)
+    os.replace(tmp_path, path)
+
+
+def input_columns(*models):
+    """
+    The raw columns the models were fitted on, or None when unknown.
+    """
+    columns = []
+    for model in models:
+        names = getattr(model, "feature_names_in_", None)
+        if names is None:
+            return None
+        columns += [c for c in names if c not in columns]
+    return columns
 
 
 def evaluate(model, X, y):
+    """
+    ROC-AUC, PR-AUC and F1 at 0.5, all from one predict_proba call.
+    """
     probs = model.predict_proba(X)[:, 1]
 
     roc_auc = roc_auc_score(y, probs)
@@ -27,21 +120,13 @@ def evaluate(model, X, y):
     f1 = f1_score(y, preds)
 
     return {
-        "roc_auc": roc_auc,
-        "pr_auc": pr_auc,
-        "f1": f1
+        "roc_auc": float(roc_auc),
+        "pr_auc": float(pr_auc),
+        "f1": float(f1)
     }
 
 
-def select_best_model(prod_model_uri: str, new_model_uri: str):
-    X_val, y_val = load_validation_data()
-
-    prod_model = mlflow.sklearn.load_model(prod_model_uri)
-    new_model = mlflow.sklearn.load_model(new_model_uri)
-
-    prod_metrics = evaluate(prod_model, X_val, y_val)
-    new_metrics = evaluate(new_model, X_val, y_val)
-
+def _decide(prod_metrics: dict, new_metrics: dict) -> dict:
     wins = sum(
         new_metrics[m] > prod_metrics[m]
         for m in prod_metrics
@@ -55,3 +140,51 @@ def select_best_model(prod_model_uri: str, new_model_uri: str):
         "new_model_metrics": new_metrics,
         "wins": wins
     }
+
+
+def select_best_models(
+    prod_model_uri: str,
+    challenger_uris: List[str],
+    n_jobs: int = -1
+) -> dict:
+    """
+    Compare every challenger with the production model on the validation
+    set. Challengers are evaluated in parallel (n_jobs as in joblib) and
+    the production model only when its metrics for this validation set
+    are not cached yet.
+    """
+    val_hash = validation_hash()
+    prod_key = _metrics_key(prod_model_uri, val_hash)
+    prod_metrics = _cached_metrics(prod_key)
+
+    uris = list(challenger_uris)
+    if prod_metrics is None:
+        uris.append(prod_model_uri)
+    models = {uri: model_cache.load_model(uri)[0] for uri in uris}
+    X_val, y_val = load_validation_data(input_columns(*models.values()))
+
+    results = Parallel(n_jobs=n_jobs if len(uris) > 1 else 1)(
+        delayed(evaluate)(models[uri], X_val, y_val) for uri in uris
+    )
+    metrics = dict(zip(uris, results))
+    if prod_metrics is None:
+        prod_metrics = metrics[prod_model_uri]
+        _store_metrics(prod_key, prod_metrics)
+
+    challengers = {
+        uri: _decide(prod_metrics, metrics[uri])
+        for uri in challenger_uris
+    }
+    promoted = [uri for uri, c in challengers.items() if c["decision"] == "promote"]
+    best = max(promoted, key=lambda uri: metrics[uri]["roc_auc"], default=None)
+    return {
+        "best": best,
+        "validation_hash": val_hash,
+        "production_metrics": prod_metrics,
+        "challengers": challengers
+    }
+
+
+def select_best_model(prod_model_uri: str, new_model_uri: str):
+    result = select_best_models(prod_model_uri, [new_model_uri])
+    return result["challengers"][new_model_uri]
@@ -1,7 +1,10 @@
+import os
+import time
 import pandas as pd
 import mlflow
 import mlflow.sklearn
 
+from joblib import Parallel, delayed
 from pathlib import Path
 from sklearn.pipeline import Pipeline
 from sklearn.linear_model import LogisticRegression
@@ -12,7 +15,8 @@ from sklearn.metrics import (
     f1_score
 )
 
-from src.data.preprocess_features import build_preprocessor
+from src.data.preprocess_features import as_float32, build_preprocessor
+from src.data.loader import apply_schema, load_schema, load_xy
 import argparse 
 
 DATA_PATH = Path("data/processed")
@@ -20,12 +24,13 @@ ARTIFACT_PATH = Path("artifacts/models")
 ARTIFACT_PATH.mkdir(parents=True, exist_ok=True)
 
 TARGET = "TARGET"
+MODEL_NAME = "credit_default_model"
+SWEEP_C = [0.01, 0.1, 1.0, 10.0]
+SWEEP_CLASS_WEIGHTS = ["balanced", None]
 
 def load_split(split_name: str):
-    df = pd.read_csv(DATA_PATH / f"{split_name}.csv")
-    X = df.drop(columns=[TARGET])
-    y = df[TARGET]
-    return X, y
+    return load_xy(split_name, data_dir=DATA_PATH)
+
 def evaluate(model, X, y):
     probs = model.predict_proba(X)[:, 1]
 
@@ -45,11 +50,114 @@ def evaluate(model, X, y):
 
 def load_retraining_data(csv_path: str):
     df = pd.read_csv(csv_path)
+    schema = load_schema(DATA_PATH)
+    if schema:
+        df = apply_schema(df, schema)
     X = df.drop(columns=[TARGET])
     y = df[TARGET]
     return X, y
 
-def main(retrain_data: str | None = None):
+def fit_candidate(params: dict, X_train, y_train, X_val, y_val):
+    """
+    Fit one sweep candidate on already transformed matrices. Runs in a
+    pool worker.
+    """
+    model = LogisticRegression(max_iter=1000, solver="lbfgs", **params)
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    return model, time.perf_counter() - started, evaluate(model, X_val, y_val)
+
+
+def promote_if_better(candidate_uri: str) -> dict:
+    """
+    Register candidate_uri when select_best_model prefers it to the
+    served version (or nothing is registered yet).
+    """
+    from src.inference.model_manager import ModelManager
+    from src.models.model_selector import select_best_model
+
+    version = ModelManager(alias=os.environ.get("MODEL_ALIAS") or None).latest_version()
+    if version is None:
+        selection = {"decision": "promote", "reason": "no registered model"}
+    else:
+        selection = select_best_model(f"models:/{MODEL_NAME}/{version}", candidate_uri)
+    if selection["decision"] == "promote":
+        mlflow.register_model(candidate_uri, MODEL_NAME)
+    return selection
+
+
+def sweep(
+    preprocessor,
+    X_train, y_train,
+    X_val, y_val,
+    X_test, y_test,
+    candidates: list,
+    n_jobs: int = -1,
+    retraining_flag: bool = False
+):
+    """
+    Fit the preprocessor once and train every candidate on the shared
+    transformed matrices in a process pool. Each candidate is logged as a
+    child run; the best on validation ROC-AUC goes to select_best_model.
+    """
+    started = time.perf_counter()
+    Xt_train = preprocessor.fit_transform(X_train, y_train)
+    Xt_val = preprocessor.transform(X_val)
+    # joblib memory-maps arrays above max_nbytes, so the workers all read
+    # one on-disk copy of the matrices instead of a pickled copy each.
+    results = Parallel(n_jobs=n_jobs, max_nbytes="1M")(
+        delayed(fit_candidate)(
+            params, Xt_train, y_train.to_numpy(), Xt_val, y_val.to_numpy()
+        )
+        for params in candidates
+    )
+
+    mlflow.set_experiment("home_credit_baseline")
+    with mlflow.start_run(run_name="logistic_regression_sweep"):
+        mlflow.set_tag("retraining", retraining_flag)
+        mlflow.log_param("candidates", len(candidates))
+        runs = []
+        for params, (model, fit_seconds, val_metrics) in zip(candidates, results):
+            pipeline = Pipeline(
+                steps=[
+                    ("preprocessor", preprocessor),
+                    ("classifier", model)
+                ]
+            )
+            run_name = f"C={params['C']}, class_weight={params['class_weight']}"
+            with mlflow.start_run(run_name=run_name, nested=True) as run:
+                mlflow.log_param("model", "LogisticRegression")
+                mlflow.log_param("C", params["C"])
+                mlflow.log_param("class_weight", params["class_weight"])
+                mlflow.log_metric("fit_seconds", fit_seconds)
+                for k, v in val_metrics.items():
+                    mlflow.log_metric(f"val_{k}", v)
+                mlflow.sklearn.log_model(sk_model=pipeline, artifact_path="model")
+            runs.append((val_metrics["roc_auc"], run.info.run_id, params, pipeline))
+            print(f"{run_name}: val {val_metrics} in {fit_seconds:.2f}s")
+
+        _, run_id, params, pipeline = max(runs, key=lambda r: r[0])
+        best_uri = f"runs:/{run_id}/model"
+        test_metrics = evaluate(pipeline, X_test, y_test)
+        mlflow.log_param("best_run_id", run_id)
+        for k, v in test_metrics.items():
+            mlflow.log_metric(f"best_test_{k}", v)
+        mlflow.log_metric("sweep_seconds", time.perf_counter() - started)
+        selection = promote_if_better(best_uri)
+        mlflow.set_tag("decision", selection["decision"])
+
+    print(f"Sweep complete in {time.perf_counter() - started:.1f}s. Best: {params}")
+    print("Test metrics:", test_metrics)
+    print("Decision:", selection["decision"])
+    return best_uri, selection
+
+
+def main(
+    retrain_data: str | None = None,
+    sparse: bool = False,
+    sweep_c: list | None = None,
+    n_jobs: int = -1
+):
     run_name = "logistic_regression_baseline"
     retraining_flag = False
     if retrain_data:
@@ -62,9 +170,28 @@ def main(retrain_data: str | None = None):
         X_train, y_train = load_split("train")
         X_val, y_val = load_split("val")
         X_test, y_test = load_split("test")
+    if sparse:
+        # Validation and test are scored at the dtype the model trained on.
+        X_train, X_val, X_test = (as_float32(X) for X in (X_train, X_val, X_test))
     preprocessor, num_features, cat_features = build_preprocessor(
-        pd.concat([X_train, y_train], axis=1)
+        pd.concat([X_train, y_train], axis=1), sparse=sparse
     )
+    if sweep_c:
+        candidates = [
+            {"C": c, "class_weight": w}
+            for c in sweep_c
+            for w in SWEEP_CLASS_WEIGHTS
+        ]
+        sweep(
+            preprocessor,
+            X_train, y_train,
+            X_val, y_val,
+            X_test, y_test,
+            candidates,
+            n_jobs=n_jobs,
+            retraining_flag=retraining_flag
+        )
+        return
     model = LogisticRegression(
         max_iter=1000,
         class_weight="balanced",
@@ -87,6 +214,7 @@ def main(retrain_data: str | None = None):
         test_metrics = evaluate(pipeline, X_test, y_test)
         mlflow.log_param("model", "LogisticRegression")
         mlflow.log_param("class_weight", "balanced")
+        mlflow.log_param("sparse", sparse)
         for k, v in val_metrics.items():
             mlflow.log_metric(f"val_{k}", v)
         for k, v in test_metrics.items():
@@ -97,7 +225,7 @@ def main(retrain_data: str | None = None):
         mlflow.sklearn.log_model(
             sk_model=pipeline,
             artifact_path="model",
-            registered_model_name="credit_default_model"
+            registered_model_name=MODEL_NAME
         )
 
     print("Training complete.")
@@ -112,6 +240,37 @@ if __name__ == "__main__":
         help="Path to retraining CSV (optional)",
         required=False
     )
+    parser.add_argument(
+        "--sparse",
+        action="store_true",
+        # Retraining runs this script as a subprocess, so it can be
+        # switched on there through the environment.
+        default=os.environ.get("TRAIN_SPARSE") == "1",
+        help="Train on a sparse float32 matrix (or set TRAIN_SPARSE=1)"
+    )
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Train one candidate per C value and class weight in parallel"
+    )
+    parser.add_argument(
+        "--sweep-c",
+        type=float,
+        nargs="+",
+        default=SWEEP_C,
+        help="Regularization strengths for --sweep"
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=-1,
+        help="Sweep worker processes (-1: one per core)"
+    )
     args = parser.parse_args()
 
-    main(retrain_data=args.data)
+    main(
+        retrain_data=args.data,
+        sparse=args.sparse,
+        sweep_c=args.sweep_c if args.sweep else None,
+        n_jobs=args.n_jobs
+    )
@@ -0,0 +1,311 @@
+import bisect
+import threading
+import numpy as np
+import pandas as pd
+from collections import Counter
+from datetime import datetime, timedelta
+from scipy.stats import kstwo
+from typing import Dict, List, Optional, Tuple
+from src.monitoring.store import flush, iter_prediction_chunks
+
+BUCKET_SECONDS = 3600
+# Buckets kept in memory (30 days of hourly buckets); opening a new one
+# beyond this evicts the oldest.
+MAX_BUCKETS = 24 * 30
+# Records that arrive during a rebuild are matched against rows the scan
+# read by (timestamp, probability), within this many seconds before the
+# rebuild started.
+REBUILD_OVERLAP_SECONDS = 600
+
+
+class DriftSketches:
+    """
+    Per-feature histograms of logged predictions in fixed time buckets.
+
+    Each feature is binned over edges taken from its reference quantiles,
+    with one extra bin counting missing values. A bucket is a single flat
+    count vector across all features, so a time-range query merges the
+    buckets it covers and its cost follows the number of buckets, not rows.
+    Only the newest max_buckets buckets are kept.
+    """
+
+    def __init__(
+        self,
+        edges: Dict[str, np.ndarray],
+        reference_counts: Dict[str, np.ndarray],
+        bucket_seconds: int = BUCKET_SECONDS,
+        max_buckets: int = MAX_BUCKETS
+    ):
+        self.features = list(edges)
+        self.index = {f: i for i, f in enumerate(self.features)}
+        self.edges = [np.asarray(edges[f], dtype=np.float64) for f in self.features]
+        # Feature i owns bins offsets[i]:offsets[i + 1]; the last is missing.
+        widths = [len(e) + 2 for e in self.edges]
+        self.offsets = np.concatenate([[0], np.cumsum(widths)]).astype(np.int64)
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self.buckets: Dict[int, np.ndarray] = {}
+        self.keys: List[int] = []
+        self._lock = threading.Lock()
+        # Listener records held back while a rebuild scans the store.
+        self._pending: Optional[List[tuple]] = None
+        self._rebuild_lock = threading.Lock()
+
+        self.reference = np.zeros(self.offsets[-1], dtype=np.int64)
+        for i, feature in enumerate(self.features):
+            counts = np.asarray(reference_counts[feature], dtype=np.int64)
+            self.reference[self.offsets[i]:self.offsets[i] + len(counts)] = counts
+
+    @classmethod
+    def from_reference_bins(
+        cls,
+        bins: Dict[str, dict],
+        bucket_seconds: int = BUCKET_SECONDS,
+        max_buckets: int = MAX_BUCKETS
+    ) -> "DriftSketches":
+        """
+        Sketches over the numeric reference bins (see src.drift.binning).
+        """
+        numeric = {f: spec for f, spec in bins.items() if spec["type"] == "numeric"}
+        return cls(
+            {f: spec["edges"] for f, spec in numeric.items()},
+            {f: spec["counts"] for f, spec in numeric.items()},
+            bucket_seconds,
+            max_buckets
+        )
+
+    def _bin(self, col: int, values: np.ndarray) -> np.ndarray:
+        """
+        Flat bin index of each value of feature col.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        bins = np.searchsorted(self.edges[col], values, side="right")
+        bins[np.isnan(values)] = len(self.edges[col]) + 1
+        return bins + self.offsets[col]
+
+    def _bucket_of(self, timestamps) -> np.ndarray:
+        seconds = np.asarray(timestamps, dtype="datetime64[s]").astype(np.int64)
+        return seconds - seconds % self.bucket_seconds
+
+    def add(self, timestamps, matrix: np.ndarray, records: List[tuple] = None):
+        """
+        Count rows x features values (columns in self.features order).
+        Listener records (passed as records) are held back instead while
+        a rebuild is running.
+        """
+        if len(matrix) == 0:
+            return
+        bucket_ids, rows = np.unique(
+            self._bucket_of(timestamps), return_inverse=True
+        )
+        counts = np.zeros((len(bucket_ids), self.offsets[-1]), dtype=np.int64)
+        for col in range(len(self.features)):
+            np.add.at(counts, (rows, self._bin(col, matrix[:, col])), 1)
+
+        with self._lock:
+            if records is not None and self._pending is not None:
+                self._pending.extend(records)
+                return
+            for bucket_id, bucket_counts in zip(bucket_ids.tolist(), counts):
+                existing = self.buckets.get(bucket_id)
+                if existing is None:
+                    self.buckets[bucket_id] = bucket_counts
+                    bisect.insort(self.keys, bucket_id)
+                else:
+                    existing += bucket_counts
+            while len(self.keys) > self.max_buckets:
+                del self.buckets[self.keys.pop(0)]
+
+    def append_records(self, records: List[tuple]):
+        """
+        Store listener: records are (timestamp, prediction, probability,
+        input_data, model_version) tuples as logged.
+        """
+        matrix = np.full((len(records), len(self.features)), np.nan)
+        for row, (_, _, _, input_data, _) in enumerate(records):
+            for feature, value in input_data.items():
+                col = self.index.get(feature)
+                if col is None or value is None or isinstance(value, str):
+                    continue
+                matrix[row, col] = value
+        self.add([record[0] for record in records], matrix, records)
+
+    def add_frame(self, df: pd.DataFrame):
+        matrix = np.full((len(df), len(self.features)), np.nan)
+        for col, feature in enumerate(self.features):
+            if feature in df.columns and pd.api.types.is_numeric_dtype(df[feature]):
+                matrix[:, col] = df[feature].to_numpy(
+                    dtype=np.float64, na_value=np.nan
+                )
+        self.add(df["timestamp"].to_numpy(dtype="datetime64[us]"), matrix)
+
+    def rebuild(self):
+        """
+        Recount every bucket from the prediction store, one row group at a
+        time.
+
+        Records logged meanwhile are held back and, once the scan is done,
+        counted unless the scan already read them, so rows are neither
+        counted twice nor lost. The store is flushed first: records counted
+        before the reset are all on disk when the scan reads it.
+        """
+        with self._rebuild_lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        with self._lock:
+            self.buckets = {}
+            self.keys = []
+            self._pending = []
+            since = np.datetime64(
+                datetime.utcnow() - timedelta(seconds=REBUILD_OVERLAP_SECONDS), "us"
+            )
+        scanned = Counter()
+        try:
+            flush()
+            for chunk in iter_prediction_chunks(columns=self.features + ["probability"]):
+                self.add_frame(chunk)
+                stamps = chunk["timestamp"].to_numpy(dtype="datetime64[us]")
+                recent = stamps >= since
+                scanned.update(zip(
+                    stamps[recent].astype(np.int64).tolist(),
+                    chunk["probability"].to_numpy(dtype=np.float64)[recent].tolist()
+                ))
+        finally:
+            with self._lock:
+                pending, self._pending = self._pending, None
+
+        unscanned = []
+        for record in pending:
+            key = (int(np.datetime64(record[0], "us").astype(np.int64)), record[2])
+            if scanned[key] > 0:
+                scanned[key] -= 1
+            else:
+                unscanned.append(record)
+        if unscanned:
+            self.append_records(unscanned)
+
+    def merge(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Tuple[np.ndarray, Optional[int], Optional[int]]:
+        """
+        Summed counts of the buckets starting in [start, end), with the
+        first and last bucket merged (None when the range is empty).
+
+        start is rounded down and end up to bucket boundaries, so the
+        answer covers whole buckets.
+        """
+        with self._lock:
+            lo = 0 if start is None else bisect.bisect_left(
+                self.keys, int(self._bucket_of(np.datetime64(start, "s")))
+            )
+            hi = len(self.keys) if end is None else bisect.bisect_left(
+                self.keys, int(np.datetime64(end, "s").astype(np.int64))
+            )
+            keys = self.keys[lo:hi]
+            total = np.zeros(self.offsets[-1], dtype=np.int64)
+            for key in keys:
+                total += self.buckets[key]
+        if not keys:
+            return total, None, None
+        return total, keys[0], keys[-1]
+
+    def _rows(self, counts: np.ndarray) -> int:
+        # Every row lands in exactly one bin of each feature.
+        return int(counts[self.offsets[0]:self.offsets[1]].sum())
+
+    def _range_info(self, first: int, last: int, counts: np.ndarray) -> dict:
+        return {
+            "from": pd.Timestamp(first, unit="s").isoformat(),
+            "to": pd.Timestamp(last + self.bucket_seconds, unit="s").isoformat(),
+            "samples": self._rows(counts)
+        }
+
+    def compare(
+        self,
+        current: np.ndarray,
+        baseline: np.ndarray,
+        min_samples: int = 10
+    ) -> Dict[str, dict]:
+        """
+        Binned two-sample KS per feature: the largest gap between the two
+        CDFs at the bin edges. This is a lower bound on the exact KS
+        statistic, exact up to the reference-quantile resolution.
+        """
+        results = {}
+        for col, feature in enumerate(self.features):
+            a, b = self.offsets[col], self.offsets[col + 1] - 1
+            cur, base = current[a:b], baseline[a:b]
+            n, m = int(cur.sum()), int(base.sum())
+            if n < min_samples or m < min_samples:
+                continue
+            gap = np.abs(np.cumsum(cur) / n - np.cumsum(base) / m)
+            statistic = float(gap.max())
+            en = n * m / (n + m)
+            p_value = float(kstwo.sf(statistic, max(int(round(en)), 1)))
+            results[feature] = {
+                "statistic": statistic,
+                "p_value": p_value,
+                "samples": n
+            }
+        return results
+
+    def range_drift(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        compare_start: Optional[datetime] = None,
+        compare_end: Optional[datetime] = None
+    ) -> dict:
+        """
+        Drift of the predictions in [start, end) against the reference, or
+        against [compare_start, compare_end) when either is given, in the
+        shape of analyzer.aggregate_drift.
+        """
+        current, first, last = self.merge(start, end)
+        if first is None or not self.features:
+            return {"status": "no_data"}
+
+        if compare_start is None and compare_end is None:
+            baseline = self.reference
+            baseline_info = {"type": "reference"}
+        else:
+            baseline, b_first, b_last = self.merge(compare_start, compare_end)
+            if b_first is None:
+                return {"status": "no_comparison_data"}
+            baseline_info = {
+                "type": "range",
+                **self._range_info(b_first, b_last, baseline)
+            }
+
+        drift_summary = {}
+        for feature, result in self.compare(current, baseline).items():
+            p_value = result["p_value"]
+            drift_summary[feature] = {
+                "statistic": round(result["statistic"], 6),
+                "p_value": round(p_value, 6),
+                "drift_detected": bool(p_value < 0.05)
+            }
+
+        drifted_features = sum(
+            1 for v in drift_summary.values() if v["drift_detected"]
+        )
+        current_info = self._range_info(first, last, current)
+        return {
+            "status": "ok",
+            "samples": current_info["samples"],
+            "time_range": {
+                "from": current_info["from"],
+                "to": current_info["to"]
+            },
+            "baseline": baseline_info,
+            "bucket_seconds": self.bucket_seconds,
+            "total_features_checked": len(drift_summary),
+            "drifted_features": drifted_features,
+            "drift_ratio": round(
+                drifted_features / max(len(drift_summary), 1), 3
+            ),
+            "details": drift_summary
+        }
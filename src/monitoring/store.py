@@ -1,28 +1,1011 @@
+import atexit
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-import json
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: segment locking covers this process only
+    fcntl = None
 
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(exist_ok=True)
 
+# Legacy row-per-prediction CSV with a JSON "features" column.
 LOG_FILE = LOG_DIR / "predictions.csv"
 
+SEGMENT_DIR = LOG_DIR / "predictions"
+SEGMENT_DIR.mkdir(exist_ok=True)
+
+# Every worker process writes its own segments. Rewrites of existing ones
+# (compaction, clears, migration) take LOCK_FILE exclusively and reads take
+# it shared; each rewrite also bumps GENERATION_FILE so other workers know
+# to reload.
+LOCK_FILE = SEGMENT_DIR / ".lock"
+GENERATION_FILE = SEGMENT_DIR / "GENERATION"
+
+# record_id is assigned when a row is first persisted and never changes.
+META_COLUMNS = [
+    "timestamp", "prediction", "probability", "model_version", "record_id"
+]
+# Synchronous logging buffers rows in memory and writes a segment once
+# there are SEGMENT_ROWS of them or, from a timer, FLUSH_SECONDS after the
+# first buffered row, so a quiet period still reaches disk. At most
+# FLUSH_SECONDS of predictions are lost if the process dies without
+# running its exit handlers; a clean exit flushes the buffer.
+SEGMENT_ROWS = 1000
+FLUSH_SECONDS = 30
+
+# Background writer: one segment per BATCH_ROWS records or BATCH_MILLIS ms,
+# whichever comes first. Producers wait at most PUT_TIMEOUT seconds for
+# queue space before the record is dropped and counted.
+QUEUE_SIZE = 10000
+BATCH_ROWS = 500
+BATCH_MILLIS = 1000
+PUT_TIMEOUT = 0.0
+
+# Small segments written by this process are merged once there are
+# COMPACT_SEGMENTS of them, into segments of up to COMPACT_ROWS rows.
+COMPACT_SEGMENTS = 32
+COMPACT_ROWS = 100000
+# Segments younger than COMPACT_MIN_AGE seconds are left alone, so that
+# followers in other workers (polling every FOLLOW_SECONDS) have read them
+# under their own name before they are merged away.
+COMPACT_MIN_AGE = 60
+FOLLOW_SECONDS = 5
+
+# Row groups are the unit of tail and time-range reads; their row counts and
+# timestamp min/max in the segment footers act as the log's index.
+ROW_GROUP_ROWS = 10000
+
+_buffer: List[tuple] = []
+_lock = threading.Lock()
+# Held from taking the buffer to writing it, so a flush() returns only once
+# no buffered record is in flight to disk.
+_flush_lock = threading.Lock()
+_flush_timer = None
+_segments_lock = threading.RLock()
+_sequence = itertools.count()
+_lock_state = {"pid": None, "file": None, "depth": 0}
+_writer = None
+_follower = None
+_listeners: List[tuple] = []
+_index_cache: Dict[Path, tuple] = {}
+
+
+@contextmanager
+def _segments_locked(exclusive: bool = False):
+    """
+    Hold the segment files steady: the thread lock within this process plus
+    a shared (readers) or exclusive (rewriters) flock across workers.
+    Writing a brand-new segment needs neither, as it appears atomically.
+    Nested use keeps the outermost mode.
+    """
+    with _segments_lock:
+        outermost = _lock_state["depth"] == 0
+        if outermost and fcntl is not None:
+            # Reopen after a fork; a shared descriptor would share the lock.
+            if _lock_state["pid"] != os.getpid():
+                _lock_state["file"] = open(LOCK_FILE, "a")
+                _lock_state["pid"] = os.getpid()
+            fcntl.flock(
+                _lock_state["file"],
+                fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            )
+        _lock_state["depth"] += 1
+        try:
+            yield
+        finally:
+            _lock_state["depth"] -= 1
+            if outermost and fcntl is not None:
+                fcntl.flock(_lock_state["file"], fcntl.LOCK_UN)
+
+
+def _read_generation() -> int:
+    try:
+        return int(GENERATION_FILE.read_text())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _bump_generation():
+    """
+    Record a rewrite of the log for other workers; call under the
+    exclusive lock. This process's listeners are reset directly.
+    """
+    tmp_path = GENERATION_FILE.with_suffix(".tmp")
+    tmp_path.write_text(str(_read_generation() + 1))
+    os.replace(tmp_path, GENERATION_FILE)
+    follower = _follower
+    if follower is not None:
+        follower.mark()
+
+
+def _column_array(values: list) -> pa.Array:
+    """
+    Typed Arrow column for one feature: float64 unless any value is a string.
+    """
+    if any(isinstance(v, str) for v in values):
+        return pa.array(
+            [None if v is None else str(v) for v in values], type=pa.string()
+        )
+    return pa.array(
+        [None if v is None else float(v) for v in values], type=pa.float64()
+    )
+
+
+def _records_to_table(records: List[tuple], persist: bool = True) -> pa.Table:
+    """
+    Arrow table of logged records; only rows being persisted get record ids.
+    """
+    features = {}
+    for _, _, _, input_data, _ in records:
+        for key in input_data:
+            features.setdefault(key, None)
+
+    columns = {
+        "timestamp": pa.array([r[0] for r in records], type=pa.timestamp("us")),
+        "prediction": pa.array([r[1] for r in records], type=pa.int8()),
+        "probability": pa.array([r[2] for r in records], type=pa.float64()),
+        "model_version": pa.array([r[4] for r in records], type=pa.string())
+    }
+    if persist:
+        columns["record_id"] = pa.array(
+            [uuid.uuid4().hex for _ in records], type=pa.string()
+        )
+    for key in features:
+        if key in columns:
+            continue
+        columns[key] = _column_array([r[3].get(key) for r in records])
+    return pa.table(columns)
+
+
+def _concat_tables(tables: List[pa.Table]) -> pa.Table:
+    """
+    Concatenate segments whose feature sets or column types differ; a
+    column that is a string in any segment becomes a string everywhere.
+    """
+    types: Dict[str, set] = {}
+    for table in tables:
+        for field in table.schema:
+            types.setdefault(field.name, set()).add(field.type)
+
+    schema = []
+    for name, found in types.items():
+        if len(found) == 1:
+            target = next(iter(found))
+        elif pa.string() in found:
+            target = pa.string()
+        else:
+            target = pa.float64()
+        schema.append(pa.field(name, target))
+    schema = pa.schema(schema)
+
+    aligned = []
+    for table in tables:
+        columns = []
+        for field in schema:
+            if field.name in table.column_names:
+                columns.append(table.column(field.name).cast(field.type))
+            else:
+                columns.append(pa.nulls(len(table), type=field.type))
+        aligned.append(pa.table(columns, schema=schema))
+    return pa.concat_tables(aligned)
+
+
+def _write_table(table: pa.Table, path: Path = None) -> Path:
+    """
+    Write a segment atomically so readers never see a partial file.
+    """
+    if path is None:
+        first = table.column("timestamp")[0].as_py()
+        micros = int(first.timestamp() * 1_000_000)
+        path = SEGMENT_DIR / (
+            f"part-{micros:016d}-{os.getpid()}-{next(_sequence):06d}.parquet"
+        )
+    tmp_path = path.with_suffix(".tmp")
+    pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp_path, path)
+    return path
+
+
+def flush():
+    """
+    Persist buffered predictions as a new segment and wait until the
+    background writer has written everything queued before the call.
+    """
+    with _flush_lock:
+        with _lock:
+            records = list(_buffer)
+            _buffer.clear()
+        if records:
+            _write_table(_records_to_table(records))
+    writer = _writer
+    if writer is not None:
+        writer.sync()
+
+
+def _timed_flush():
+    global _flush_timer
+    with _lock:
+        _flush_timer = None
+    try:
+        flush()
+    except Exception as e:
+        print(f"Prediction log flush failed: {e}")
+
+
+def _schedule_flush():
+    """
+    Start the FLUSH_SECONDS timer unless one is pending. Called with _lock
+    held.
+    """
+    global _flush_timer
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(FLUSH_SECONDS, _timed_flush)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+class BackgroundWriter:
+    """
+    Group-commit writer for the prediction log.
+
+    log_prediction only enqueues a record; a daemon thread drains the
+    bounded queue and writes one segment per batch. A full queue drops the
+    record rather than stalling the request, and stop() writes everything
+    already queued before returning.
+    """
+
+    def __init__(
+        self,
+        batch_rows: int = BATCH_ROWS,
+        batch_millis: int = BATCH_MILLIS,
+        queue_size: int = QUEUE_SIZE,
+        put_timeout: float = PUT_TIMEOUT
+    ):
+        self.batch_rows = batch_rows
+        self.batch_seconds = batch_millis / 1000
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.counters = {
+            "enqueued": 0,
+            "dropped": 0,
+            "written": 0,
+            "batches": 0,
+            "write_errors": 0
+        }
+        self._counter_lock = threading.Lock()
+        self._thread = None
+        self._uncompacted = 0
+
+    def _count(self, name: str, amount: int = 1):
+        with self._counter_lock:
+            self.counters[name] += amount
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="prediction-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, records: List[tuple]) -> bool:
+        """
+        Enqueue records as one unit; they are always written together.
+        """
+        try:
+            if self.put_timeout > 0:
+                self.queue.put(records, timeout=self.put_timeout)
+            else:
+                self.queue.put_nowait(records)
+        except queue.Full:
+            self._count("dropped", len(records))
+            return False
+        self._count("enqueued", len(records))
+        return True
+
+    def stop(self, timeout: float = 30):
+        # The sentinel queues behind every accepted record, so the thread
+        # has written all of them by the time it sees it.
+        self.queue.put(None)
+        self._thread.join(timeout)
+
+    def sync(self, timeout: float = 30) -> bool:
+        """
+        Wait until every record queued before the call is written.
+        """
+        written = threading.Event()
+        try:
+            self.queue.put(written, timeout=timeout)
+        except queue.Full:
+            return False
+        return written.wait(timeout)
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats["queue_depth"] = self.queue.qsize()
+        return stats
+
+    def _run(self):
+        while True:
+            records = self.queue.get()
+            if records is None:
+                return
+            if isinstance(records, threading.Event):
+                records.set()
+                continue
+            batch = list(records)
+            deadline = time.monotonic() + self.batch_seconds
+            stopping = False
+            synced = None
+
+            while len(batch) < self.batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    records = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if records is None:
+                    stopping = True
+                    break
+                if isinstance(records, threading.Event):
+                    synced = records
+                    break
+                batch.extend(records)
+
+            self._write(batch)
+            if synced is not None:
+                synced.set()
+            if stopping:
+                return
+
+    def _write(self, batch: List[tuple]):
+        try:
+            _write_table(_records_to_table(batch))
+        except Exception as e:
+            self._count("write_errors")
+            print(f"Prediction log write failed, {len(batch)} records lost: {e}")
+            return
+        self._count("written", len(batch))
+        self._count("batches")
+
+        self._uncompacted += 1
+        if self._uncompacted < COMPACT_SEGMENTS:
+            return
+        self._uncompacted = 0
+        try:
+            compact_segments(force=True)
+        except Exception as e:
+            print(f"Prediction log compaction failed: {e}")
+
+
+def start_background_writer(**kwargs) -> BackgroundWriter:
+    """
+    Switch log_prediction to asynchronous group commits.
+    """
+    global _writer
+    if _writer is None:
+        flush()
+        _writer = BackgroundWriter(**kwargs)
+        _writer.start()
+    return _writer
+
+
+def stop_background_writer():
+    """
+    Drain the queue, write the final batch and return to synchronous logging.
+    """
+    global _writer
+    writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+
+def writer_stats() -> Optional[dict]:
+    writer = _writer
+    return writer.stats() if writer is not None else None
+
+
+def _frame_records(df: pd.DataFrame) -> List[tuple]:
+    features = feature_columns(df)
+    values = df[features].astype(object)
+    inputs = values.where(values.notna(), None).to_dict("records")
+    versions = (
+        df["model_version"].astype(object).where(df["model_version"].notna(), None)
+        if "model_version" in df.columns else [None] * len(df)
+    )
+    return [
+        (timestamp.to_pydatetime(), int(prediction), float(probability), data, version)
+        for timestamp, prediction, probability, data, version in zip(
+            df["timestamp"], df["prediction"], df["probability"], inputs, versions
+        )
+    ]
+
+
+class SegmentFollower:
+    """
+    Feeds this process's listeners the predictions other workers log.
+
+    Each worker writes its own segments, so without this a worker's
+    in-memory window only sees its own share of the traffic. A daemon
+    thread polls the segment directory and passes rows from segments other
+    processes wrote since the last poll to the listeners, in timestamp
+    order. A rewrite elsewhere (GENERATION_FILE moved on), or foreign row
+    counts that no longer add up, resets the listeners instead.
+    """
+
+    def __init__(self, interval: float = FOLLOW_SECONDS):
+        self.interval = interval
+        self.generation = None
+        # Foreign segment -> rows already passed on.
+        self.seen: Dict[Path, int] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _foreign(self) -> Dict[Path, int]:
+        pid = os.getpid()
+        rows = {}
+        for path in list_segments():
+            if _segment_pid(path) == pid:
+                continue
+            try:
+                rows[path] = sum(entry[1] for entry in _segment_index(path))
+            except FileNotFoundError:
+                continue
+        return rows
+
+    def mark(self):
+        """
+        Treat everything on disk as already seen.
+        """
+        with _segments_locked():
+            self.generation = _read_generation()
+            self.seen = self._foreign()
+
+    def poll(self):
+        frames, reset = [], False
+        with _segments_locked():
+            current = self._foreign()
+            new = [path for path in current if path not in self.seen]
+            # Compaction moves rows between foreign segments but keeps
+            # their total; anything else means rows were missed.
+            expected = sum(self.seen.values()) + sum(current[p] for p in new)
+            if (
+                _read_generation() != self.generation
+                or sum(current.values()) != expected
+            ):
+                reset = True
+            elif new:
+                units = [
+                    (path, row_group, rows, lo, hi)
+                    for path in new
+                    for row_group, rows, lo, hi in _segment_index(path)
+                ]
+                frames = _read_row_groups(units)
+            if reset:
+                self.generation = _read_generation()
+            self.seen = current
+
+        if reset:
+            _notify_reset()
+            return
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return
+        df = pd.concat(frames, ignore_index=True)
+        df = df.sort_values("timestamp", kind="stable", ignore_index=True)
+        records = _frame_records(df)
+        for on_records, _ in _listeners:
+            on_records(records)
+
+    def start(self):
+        self.mark()
+        self._thread = threading.Thread(
+            target=self._run, name="prediction-log-follower", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Prediction log follow failed: {e}")
+
+
+def start_follower(**kwargs) -> SegmentFollower:
+    """
+    Pass predictions logged by other worker processes to the listeners.
+    """
+    global _follower
+    if _follower is None:
+        _follower = SegmentFollower(**kwargs)
+        _follower.start()
+    return _follower
+
+
+def stop_follower():
+    global _follower
+    follower, _follower = _follower, None
+    if follower is not None:
+        follower.stop()
+
+
+atexit.register(flush)
+atexit.register(stop_background_writer)
+atexit.register(stop_follower)
+
+
+def subscribe(
+    on_records: Callable[[List[tuple]], None],
+    on_reset: Callable[[], None] = None
+):
+    """
+    Call on_records with every batch of logged (timestamp, prediction,
+    probability, input_data, model_version) records as it arrives, and on_reset after the
+    persisted log has been rewritten or cleared.
+    """
+    _listeners.append((on_records, on_reset))
+
+
+def _notify_reset():
+    for _, on_reset in _listeners:
+        if on_reset is not None:
+            on_reset()
+
+
 def log_prediction(
     input_data: dict,
     prediction: int,
-    probability: float
+    probability: float,
+    model_version: Optional[str] = None
 ):
-    record = {
-        "timestamp": datetime.utcnow().isoformat(),
-        "prediction": prediction,
-        "probability": probability,
-        "features": json.dumps(input_data)
-    }
+    log_predictions([input_data], [prediction], [probability], model_version)
 
-    df = pd.DataFrame([record])
 
-    if LOG_FILE.exists():
-        df.to_csv(LOG_FILE, mode="a", header=False, index=False)
+def log_predictions(
+    inputs: List[dict],
+    predictions: List[int],
+    probabilities: List[float],
+    model_version: Optional[str] = None
+):
+    """
+    Log a batch of predictions, all made by model_version, as a single
+    store write.
+    """
+    now = datetime.utcnow()
+    records = [
+        (now, int(prediction), float(probability), dict(input_data), model_version)
+        for input_data, prediction, probability in zip(
+            inputs, predictions, probabilities
+        )
+    ]
+    if not records:
+        return
+
+    # Listeners hear of records only once they are queued or buffered, so
+    # a flush() after a listener call always covers them.
+    writer = _writer
+    if writer is not None:
+        writer.submit(records)
+        full = False
     else:
-        df.to_csv(LOG_FILE, index=False)
+        with _lock:
+            _buffer.extend(records)
+            full = (
+                len(_buffer) >= SEGMENT_ROWS
+                or (now - _buffer[0][0]).total_seconds() >= FLUSH_SECONDS
+            )
+            if not full:
+                _schedule_flush()
+
+    for on_records, _ in _listeners:
+        on_records(records)
+    if full:
+        flush()
+
+
+def list_segments() -> List[Path]:
+    return sorted(SEGMENT_DIR.glob("part-*.parquet"))
+
+
+def _segment_pid(path: Path) -> int:
+    return int(path.stem.split("-")[2])
+
+
+def compact_segments(force: bool = False):
+    """
+    Merge runs of this process's small segments into larger ones. Only
+    segments written by this process are touched, so concurrent writers
+    never rewrite each other's files, and only once they are
+    COMPACT_MIN_AGE seconds old.
+    """
+    pid = os.getpid()
+    settled = time.time() - COMPACT_MIN_AGE
+    with _segments_locked(exclusive=True):
+        own = [
+            (path, pq.read_metadata(path).num_rows)
+            for path in list_segments()
+            if _segment_pid(path) == pid and path.stat().st_mtime <= settled
+        ]
+        small = [(p, rows) for p, rows in own if rows < COMPACT_ROWS]
+        if not force and len(small) < COMPACT_SEGMENTS:
+            return
+
+        runs, run, run_rows = [], [], 0
+        for path, rows in small:
+            if run and run_rows + rows > COMPACT_ROWS:
+                runs.append(run)
+                run, run_rows = [], 0
+            run.append(path)
+            run_rows += rows
+        runs.append(run)
+
+        for run in runs:
+            if len(run) < 2:
+                continue
+            table = _concat_tables([pq.read_table(p) for p in run])
+            _write_table(table, run[0])
+            for path in run[1:]:
+                path.unlink()
+
+
+def _segment_index(path: Path) -> List[tuple]:
+    """
+    (row_group, rows, min_ts, max_ts) for each row group of a segment, read
+    from its footer once and cached until the file changes.
+    """
+    stat = path.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _index_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    metadata = pq.read_metadata(path)
+    ts_col = metadata.schema.to_arrow_schema().get_field_index("timestamp")
+    entries = []
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        stats = row_group.column(ts_col).statistics
+        if stats is not None and stats.has_min_max:
+            lo, hi = pd.Timestamp(stats.min), pd.Timestamp(stats.max)
+        else:
+            lo, hi = pd.Timestamp.min, pd.Timestamp.max
+        entries.append((i, row_group.num_rows, lo, hi))
+
+    _index_cache[path] = (key, entries)
+    return entries
+
+
+def _row_groups(start: datetime = None, end: datetime = None) -> List[tuple]:
+    """
+    (path, row_group, rows, min_ts, max_ts) for every persisted row group
+    that can hold rows in [start, end).
+    """
+    units = []
+    segments = list_segments()
+    for path in segments:
+        try:
+            entries = _segment_index(path)
+        except FileNotFoundError:
+            continue
+        for row_group, rows, lo, hi in entries:
+            if start is not None and hi < start:
+                continue
+            if end is not None and lo >= end:
+                continue
+            units.append((path, row_group, rows, lo, hi))
+
+    for stale in set(_index_cache) - set(segments):
+        _index_cache.pop(stale, None)
+    return units
+
+
+def _select_tail(
+    units: List[tuple],
+    last_n: int,
+    start: datetime = None,
+    end: datetime = None
+) -> List[tuple]:
+    """
+    Smallest set of row groups guaranteed to hold the last_n newest rows.
+
+    Row groups are taken newest first; once enough rows are in hand, the
+    next group can only matter if it overlaps the oldest group taken.
+    Groups straddling start/end are not counted, as only part of them is
+    in range.
+    """
+    chosen, rows, oldest = [], 0, None
+    for unit in sorted(units, key=lambda u: u[4], reverse=True):
+        if rows >= last_n and unit[4] < oldest:
+            break
+        chosen.append(unit)
+        oldest = unit[3] if oldest is None else min(oldest, unit[3])
+        straddles = (
+            (start is not None and unit[3] < start)
+            or (end is not None and unit[4] >= end)
+        )
+        if not straddles:
+            rows += unit[2]
+    return chosen
+
+
+def _read_row_groups(
+    units: List[tuple],
+    columns: Optional[List[str]] = None
+) -> List[pd.DataFrame]:
+    by_path: Dict[Path, List[int]] = {}
+    for path, row_group, _, _, _ in units:
+        by_path.setdefault(path, []).append(row_group)
+
+    frames = []
+    for path, row_groups in by_path.items():
+        parquet_file = pq.ParquetFile(path)
+        projected = columns
+        if columns is not None:
+            available = set(parquet_file.schema_arrow.names)
+            projected = [c for c in columns if c in available]
+        table = parquet_file.read_row_groups(sorted(row_groups), columns=projected)
+        frames.append(table.to_pandas())
+    return frames
+
+
+def _sync_writer():
+    """
+    Wait for the background writer, so rows logged before a read are on
+    disk when the read runs (not for up to BATCH_MILLIS later).
+    """
+    writer = _writer
+    if writer is not None and threading.current_thread() is not writer._thread:
+        writer.sync()
+
+
+def _buffered_frame(columns: Optional[List[str]] = None) -> pd.DataFrame:
+    with _lock:
+        records = list(_buffer)
+    if not records:
+        return pd.DataFrame()
+
+    df = _records_to_table(records, persist=False).to_pandas()
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def read_predictions(
+    last_n: int = None,
+    start: datetime = None,
+    end: datetime = None,
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Logged predictions in timestamp order with one typed column per feature.
+
+    last_n keeps only the most recent rows, start/end restrict to a
+    [start, end) time range and columns projects to the given features
+    (timestamp is always included). Only the row groups that can hold the
+    requested rows are read, so cost follows the window, not the log size.
+    """
+    if columns is not None:
+        columns = ["timestamp"] + [c for c in columns if c != "timestamp"]
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    _sync_writer()
+    with _segments_locked():
+        units = _row_groups(start, end)
+        if last_n is not None:
+            units = _select_tail(units, last_n, start, end)
+        frames = _read_row_groups(units, columns)
+    frames.append(_buffered_frame(columns))
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns or META_COLUMNS)
+
+    df = pd.concat(frames, ignore_index=True)
+    if start is not None:
+        df = df[df["timestamp"] >= start]
+    if end is not None:
+        df = df[df["timestamp"] < end]
+    df = df.sort_values("timestamp", kind="stable", ignore_index=True)
+    if last_n is not None:
+        df = df.tail(last_n).reset_index(drop=True)
+    return df
+
+
+def read_feature_matrix(
+    features: List[str],
+    last_n: int = None,
+    start: datetime = None,
+    end: datetime = None
+) -> np.ndarray:
+    """
+    Rows x features float matrix of logged values; missing or non-numeric
+    features come back as NaN.
+    """
+    df = read_predictions(last_n, start, end, columns=features)
+    matrix = np.full((len(df), len(features)), np.nan)
+    for i, feature in enumerate(features):
+        if feature in df.columns and pd.api.types.is_numeric_dtype(df[feature]):
+            matrix[:, i] = df[feature].to_numpy(dtype=np.float64, na_value=np.nan)
+    return matrix
+
+
+def iter_prediction_chunks(
+    columns: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Every logged prediction, one row group (then the unflushed buffer) at a
+    time and in no particular order, for full-log scans that should not
+    hold the whole log in memory. Compaction waits until the scan is done.
+    """
+    if columns is not None:
+        columns = ["timestamp"] + [c for c in columns if c != "timestamp"]
+    _sync_writer()
+    with _segments_locked():
+        for unit in _row_groups():
+            for frame in _read_row_groups([unit], columns):
+                if not frame.empty:
+                    yield frame
+    buffered = _buffered_frame(columns)
+    if not buffered.empty:
+        yield buffered
+
+
+def feature_columns(df: pd.DataFrame) -> List[str]:
+    return [c for c in df.columns if c not in META_COLUMNS]
+
+
+def count_predictions() -> int:
+    _sync_writer()
+    with _lock:
+        buffered = len(_buffer)
+    with _segments_locked():
+        return buffered + sum(unit[2] for unit in _row_groups())
+
+
+def rewrite_recent(
+    n: int,
+    transform: Callable[[pd.DataFrame], pd.DataFrame]
+) -> int:
+    """
+    Apply transform to a frame of the last n predictions and write the
+    result back in place of the segments holding them. Returns the number
+    of rows passed to transform.
+
+    The segments are picked by the row-group timestamp index, as for
+    read_predictions(last_n=), so segments from several workers with
+    overlapping time ranges are handled.
+    """
+    flush()
+    with _segments_locked(exclusive=True):
+        units = _select_tail(_row_groups(), n)
+        segments = sorted({unit[0] for unit in units})
+        if not segments:
+            return 0
+
+        df = _concat_tables([pq.read_table(path) for path in segments]).to_pandas()
+        df = df.sort_values("timestamp", kind="stable", ignore_index=True)
+        split = max(len(df) - n, 0)
+        head = df.iloc[:split]
+        tail = transform(df.iloc[split:].copy())
+        df = pd.concat([head, tail], ignore_index=True)
+
+        _write_table(pa.Table.from_pandas(df, preserve_index=False), segments[0])
+        for path in segments[1:]:
+            path.unlink()
+        _bump_generation()
+    _notify_reset()
+    return len(tail)
+
+
+def clear_predictions(before: datetime = None):
+    """
+    Drop every logged prediction, buffered or persisted, from every worker.
+    With before, only rows logged before it are dropped, so predictions
+    that arrive while a retraining run reads the log survive its clear.
+    """
+    with _lock:
+        if before is None:
+            _buffer.clear()
+        else:
+            _buffer[:] = [r for r in _buffer if r[0] >= before]
+
+    cutoff = pd.Timestamp(before) if before is not None else None
+    with _segments_locked(exclusive=True):
+        for path in list_segments():
+            entries = _segment_index(path)
+            if cutoff is None or not entries or max(e[3] for e in entries) < cutoff:
+                path.unlink()
+            elif min(e[2] for e in entries) < cutoff:
+                table = pq.read_table(path)
+                kept = table.filter(pc.greater_equal(
+                    table.column("timestamp"),
+                    pa.scalar(cutoff.to_pydatetime(), type=pa.timestamp("us"))
+                ))
+                _write_table(kept, path)
+        _bump_generation()
+    _notify_reset()
+
+
+def append_frame(df: pd.DataFrame):
+    """
+    Persist a frame of already-made predictions (timestamp, prediction,
+    probability and feature columns) directly as segments, for bulk
+    imports and load generation. Listeners get a reset, as after a rewrite.
+    """
+    if df.empty:
+        return
+    df = df.sort_values("timestamp", kind="stable")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.set_column(
+        table.schema.get_field_index("timestamp"),
+        "timestamp",
+        table.column("timestamp").cast(pa.timestamp("us"))
+    )
+    table = table.set_column(
+        table.schema.get_field_index("prediction"),
+        "prediction",
+        table.column("prediction").cast(pa.int8())
+    )
+    if "record_id" not in table.column_names:
+        table = table.append_column("record_id", pa.array(
+            [uuid.uuid4().hex for _ in range(len(table))], type=pa.string()
+        ))
+    with _segments_locked():
+        for start in range(0, len(table), COMPACT_ROWS):
+            _write_table(table.slice(start, COMPACT_ROWS))
+    _notify_reset()
+
+
+def migrate_legacy_log():
+    """
+    Convert the legacy predictions.csv (JSON features column) into a
+    segment, once, and keep the original alongside as predictions.csv.migrated.
+    Workers starting together migrate it only once.
+    """
+    if not LOG_FILE.exists():
+        return
+    with _segments_locked(exclusive=True):
+        if LOG_FILE.exists():
+            _migrate_legacy_log()
+
+
+def _migrate_legacy_log():
+    df = pd.read_csv(LOG_FILE)
+    if not df.empty:
+        records = [
+            (
+                datetime.fromisoformat(row.timestamp),
+                int(row.prediction),
+                float(row.probability),
+                json.loads(row.features),
+                None
+            )
+            for row in df.itertuples(index=False)
+        ]
+        records.sort(key=lambda r: r[0])
+        _write_table(_records_to_table(records))
+    LOG_FILE.rename(LOG_FILE.with_suffix(".csv.migrated"))
+    print(f"Migrated {len(df)} predictions from {LOG_FILE}")
@@ -0,0 +1,117 @@
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+from src.monitoring.store import feature_columns
+
+WINDOW_CAPACITY = 5000
+
+
+class FeatureWindow:
+    """
+    Fixed-capacity ring buffer of the most recent logged predictions.
+
+    Numeric feature values are kept in a capacity x features float matrix
+    (one column per feature, NaN where a record did not carry it), so a
+    drift window is a slice of memory instead of a read of the log.
+    String-valued features get one object array each, None where missing.
+    """
+
+    def __init__(self, capacity: int = WINDOW_CAPACITY):
+        self.capacity = capacity
+        self.index: Dict[str, int] = {}
+        self.values = np.full((capacity, 0), np.nan)
+        self.labels: Dict[str, np.ndarray] = {}
+        self.timestamps = np.zeros(capacity, dtype="datetime64[us]")
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    def _column(self, feature: str) -> int:
+        col = self.index.get(feature)
+        if col is None:
+            col = len(self.index)
+            self.index[feature] = col
+            if col >= self.values.shape[1]:
+                grown = np.full((self.capacity, max(2 * col, 8)), np.nan)
+                grown[:, :self.values.shape[1]] = self.values
+                self.values = grown
+        return col
+
+    def append_records(self, records: List[tuple]):
+        """
+        Store listener: records are (timestamp, prediction, probability,
+        input_data, model_version) tuples as logged.
+        """
+        with self._lock:
+            for timestamp, _, _, input_data, _ in records:
+                pos = self.total % self.capacity
+                self.values[pos] = np.nan
+                for column in self.labels.values():
+                    column[pos] = None
+                for feature, value in input_data.items():
+                    if value is None:
+                        continue
+                    if isinstance(value, str):
+                        column = self.labels.get(feature)
+                        if column is None:
+                            column = np.full(self.capacity, None, dtype=object)
+                            self.labels[feature] = column
+                        column[pos] = value
+                        continue
+                    # _column may grow self.values, so resolve it first.
+                    col = self._column(feature)
+                    self.values[pos, col] = value
+                self.timestamps[pos] = np.datetime64(timestamp, "us")
+                self.total += 1
+
+    def load_frame(self, df: pd.DataFrame):
+        """
+        Replace the window contents with a frame from the prediction store.
+        """
+        df = df.tail(self.capacity)
+        features = feature_columns(df)
+        numeric = [c for c in features if pd.api.types.is_numeric_dtype(df[c])]
+        categorical = [
+            c for c in features
+            if pd.api.types.is_object_dtype(df[c])
+            or pd.api.types.is_string_dtype(df[c])
+        ]
+        with self._lock:
+            self.index = {f: i for i, f in enumerate(numeric)}
+            self.values = np.full((self.capacity, max(len(numeric), 8)), np.nan)
+            self.values[:len(df), :len(numeric)] = df[numeric].to_numpy(
+                dtype=np.float64, na_value=np.nan
+            )
+            self.labels = {}
+            for feature in categorical:
+                column = np.full(self.capacity, None, dtype=object)
+                column[:len(df)] = df[feature].astype(object).where(
+                    df[feature].notna(), None
+                ).to_numpy()
+                self.labels[feature] = column
+            if len(df):
+                self.timestamps[:len(df)] = df["timestamp"].to_numpy(
+                    dtype="datetime64[us]"
+                )
+            self.total = len(df)
+
+    def recent(self, n: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Timestamps and per-feature values of the last n records, oldest
+        first: float arrays for numeric features, object arrays for strings.
+        """
+        with self._lock:
+            n = min(n, len(self))
+            end = self.total % self.capacity
+            rows = (np.arange(end - n, end)) % self.capacity
+            values = self.values[rows]
+            timestamps = self.timestamps[rows]
+            index = dict(self.index)
+            labels = {f: column[rows] for f, column in self.labels.items()}
+        return timestamps, {
+            **{f: values[:, col] for f, col in index.items()},
+            **labels
+        }
@@ -0,0 +1,195 @@
+"""
+Append-only store of labelled predictions for retraining.
+
+    data/retraining/accumulated/date=YYYY-MM-DD/part-<micros>-<uuid>.parquet
+    data/retraining/accumulated/_state.json   watermark and recent record ids
+
+Each accumulate() reads only the prediction log past the watermark (less
+LATE_SECONDS, for rows that reach the log after later-stamped ones),
+drops the rows it has already taken by record_id and appends the rest as
+a new segment. Retraining windows read only the newest segments.
+"""
+import json
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import List
+from src.monitoring.store import META_COLUMNS, flush, read_predictions
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+ACCUMULATED_DIR = Path("data/retraining/accumulated")
+STATE_FILE = ACCUMULATED_DIR / "_state.json"
+LOCK_FILE = ACCUMULATED_DIR / ".lock"
+# Previous single-file accumulation; imported (deduplicated) when present.
+LEGACY_CSV = Path("data/retraining/retraining.csv")
+LATE_SECONDS = 60
+KEY_COLUMNS = ["timestamp", "record_id"]
+
+
+@contextmanager
+def _locked():
+    ACCUMULATED_DIR.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(LOCK_FILE, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _load_state() -> dict:
+    if not STATE_FILE.exists():
+        return {"watermark": None, "recent_ids": []}
+    with open(STATE_FILE) as f:
+        return json.load(f)
+
+
+def _save_state(state: dict):
+    tmp_path = STATE_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def _content_keys(df: pd.DataFrame) -> pd.Series:
+    """
+    Stable keys for rows logged before record ids existed.
+    """
+    hashes = pd.util.hash_pandas_object(
+        df.drop(columns=["record_id"], errors="ignore"), index=False
+    )
+    return "h" + hashes.map("{:016x}".format)
+
+
+def labelled_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Logged predictions as accumulated rows: timestamp, record_id, the
+    features and a TARGET label (the model's own decision when the log
+    has none).
+    """
+    df = df.copy()
+    if "TARGET" not in df.columns and "probability" in df.columns:
+        df["TARGET"] = (df["probability"] > 0.5).astype(int)
+    if "record_id" not in df.columns:
+        df["record_id"] = None
+    missing = df["record_id"].isna()
+    if missing.any():
+        df.loc[missing, "record_id"] = _content_keys(df[missing])
+    drop = [c for c in META_COLUMNS if c not in KEY_COLUMNS and c in df.columns]
+    return df.drop(columns=drop)
+
+
+def list_segments() -> List[Path]:
+    return sorted(ACCUMULATED_DIR.glob("date=*/part-*.parquet"))
+
+
+def _write_segments(df: pd.DataFrame):
+    """
+    Append df as one segment per day of its timestamps; rows without a
+    timestamp (imported CSVs) go to date=unknown, which sorts first.
+    """
+    days = df["timestamp"].dt.strftime("%Y-%m-%d").fillna("0000-unknown")
+    for day, part in df.groupby(days, sort=True):
+        first = part["timestamp"].min()
+        micros = 0 if pd.isna(first) else int(first.timestamp() * 1_000_000)
+        path = ACCUMULATED_DIR / f"date={day}" / (
+            f"part-{micros:016d}-{uuid.uuid4().hex[:8]}.parquet"
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        pq.write_table(pa.Table.from_pandas(part, preserve_index=False), tmp_path)
+        os.replace(tmp_path, path)
+
+
+def _accumulated_ids() -> set:
+    ids = set()
+    for path in list_segments():
+        ids.update(pq.read_table(path, columns=["record_id"]).column(0).to_pylist())
+    return ids
+
+
+def import_legacy_csv() -> int:
+    """
+    Append the rows of LEGACY_CSV not accumulated yet and move it aside
+    as retraining.csv.imported. Returns the number of rows appended.
+    """
+    df = pd.read_csv(LEGACY_CSV)
+    if "timestamp" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    else:
+        df["timestamp"] = pd.NaT
+    df = labelled_rows(df)
+    df = df[~df["record_id"].isin(_accumulated_ids())]
+    if not df.empty:
+        _write_segments(df)
+    LEGACY_CSV.rename(LEGACY_CSV.with_suffix(".csv.imported"))
+    print(f"Imported {len(df)} rows from {LEGACY_CSV}")
+    return len(df)
+
+
+def accumulate() -> int:
+    """
+    Append predictions logged since the last call. Returns the number of
+    rows appended.
+    """
+    with _locked():
+        added = import_legacy_csv() if LEGACY_CSV.exists() else 0
+
+        state = _load_state()
+        watermark = pd.Timestamp(state["watermark"]) if state["watermark"] else None
+        start = watermark - timedelta(seconds=LATE_SECONDS) if watermark else None
+        # Rows still in this process's buffer have no record id yet.
+        flush()
+        df = read_predictions(start=start)
+        if df.empty:
+            return added
+
+        df = labelled_rows(df)
+        new = df[~df["record_id"].isin(set(state["recent_ids"]))]
+        if not new.empty:
+            _write_segments(new)
+
+        latest = df["timestamp"].max()
+        if watermark is not None:
+            latest = max(latest, watermark)
+        recent = df[df["timestamp"] >= latest - timedelta(seconds=LATE_SECONDS)]
+        _save_state({
+            "watermark": latest.isoformat(),
+            "recent_ids": recent["record_id"].tolist()
+        })
+        return added + len(new)
+
+
+def accumulated_rows() -> int:
+    return sum(pq.read_metadata(path).num_rows for path in list_segments())
+
+
+def retraining_window(window_size: int) -> pd.DataFrame:
+    """
+    The window_size most recently logged accumulated rows, read from the
+    newest segments only.
+    """
+    paths, rows = [], 0
+    for path in reversed(list_segments()):
+        if rows >= window_size:
+            break
+        paths.append(path)
+        rows += pq.read_metadata(path).num_rows
+    if not paths:
+        return pd.DataFrame()
+
+    df = pd.concat([pq.read_table(p).to_pandas() for p in paths], ignore_index=True)
+    df = df.sort_values("timestamp", kind="stable", na_position="first")
+    return df.tail(window_size).drop(columns=KEY_COLUMNS).reset_index(drop=True)
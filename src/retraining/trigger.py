@@ -2,12 +2,34 @@ from pathlib import Path
 import pandas as pd
 import datetime
 import mlflow
+import os
 import subprocess
+import time
+from src.monitoring.store import clear_predictions
+from src.retraining.accumulator import (
+    accumulate,
+    accumulated_rows,
+    retraining_window
+)
+from src.retraining.warm_start import WarmStartUnavailable, warm_start_retrain
 
-LOG_FILE = Path("logs/predictions.csv")
 RETRAIN_DATA_DIR = Path("data/retraining")
 RETRAIN_DATA_DIR.mkdir(parents=True, exist_ok=True)
-ACCUMULATED_DATA = Path("data/retraining/retraining.csv")
+
+# "auto" warm-starts the production model unless drift is severe (drift
+# ratio at or above FULL_RETRAIN_DRIFT_RATIO); "full" and "warm_start"
+# force one mode.
+RETRAIN_MODE = os.environ.get("RETRAIN_MODE", "auto")
+FULL_RETRAIN_DRIFT_RATIO = 0.3
+
+
+def retraining_mode(drift_ratio: float = None) -> str:
+    if RETRAIN_MODE in ("full", "warm_start"):
+        return RETRAIN_MODE
+    if drift_ratio is None or drift_ratio >= FULL_RETRAIN_DRIFT_RATIO:
+        return "full"
+    return "warm_start"
+
 
 def save_retraining_data(window_size: int = 200, clear_logs: bool = False):
     """
@@ -17,61 +39,84 @@ def save_retraining_data(window_size: int = 200, clear_logs: bool = False):
         window_size: Number of samples needed for retraining
         clear_logs: Whether to clear prediction logs after saving (only do this after successful retraining)
     """
-    if not ACCUMULATED_DATA.exists():
-        if not LOG_FILE.exists():
-            raise ValueError("No prediction data available")
-        df = pd.read_csv(LOG_FILE)
-        if len(df) < window_size:
-            raise ValueError(f"Not enough data for retraining: {len(df)} < {window_size}")
-        retrain_df = df.tail(window_size)
-    else:
-        df = pd.read_csv(ACCUMULATED_DATA)
-        if LOG_FILE.exists():
-            new_preds = pd.read_csv(LOG_FILE)
-            if len(new_preds) > 0:
-                if "TARGET" not in new_preds.columns and "probability" in new_preds.columns:
-                    new_preds["TARGET"] = (new_preds["probability"] > 0.5).astype(int)
-                drop_cols = ["prediction", "probability", "timestamp"]
-                new_preds = new_preds.drop(columns=[c for c in drop_cols if c in new_preds.columns])
-                df = pd.concat([df, new_preds], ignore_index=True)
-                df.to_csv(ACCUMULATED_DATA, index=False)
-        
-        if len(df) < window_size:
-            raise ValueError(f"Not enough accumulated data for retraining: {len(df)} < {window_size}")
-        retrain_df = df.tail(window_size)
+    logged_before = datetime.datetime.utcnow()
+    # Only predictions logged since the last call are read and appended.
+    accumulate()
+    available = accumulated_rows()
+    if available == 0:
+        raise ValueError("No prediction data available")
+    if available < window_size:
+        raise ValueError(f"Not enough accumulated data for retraining: {available} < {window_size}")
+    retrain_df = retraining_window(window_size)
     timestamp = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     output_path = RETRAIN_DATA_DIR / f"retrain_data_{timestamp}.csv"
     retrain_df.to_csv(output_path, index=False)
     
     print(f"Saved {len(retrain_df)} samples to {output_path}")
-    if clear_logs and LOG_FILE.exists():
-        LOG_FILE.unlink()
-        print(f"Cleared {LOG_FILE}")
+    if clear_logs:
+        clear_predictions(before=logged_before)
+        print("Cleared prediction logs")
     
     return str(output_path)
 
-def trigger_retraining_job(data_path: str):
+def _full_retrain(data_path: str) -> bool:
+    result = subprocess.run(
+        ["python", "src/models/train.py", "--data", data_path],
+        check=False,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        print(f"Retraining failed: {result.stderr}")
+    return result.returncode == 0
+
+
+def trigger_retraining_job(
+    data_path: str,
+    logged_before: datetime.datetime = None,
+    mode: str = "full"
+):
     """
     Simulates retraining.
+
+    mode "warm_start" refits the production model in this process (see
+    src/retraining/warm_start.py) and falls back to "full", a fresh
+    train.py run, when that is not possible. On success the prediction
+    logs are cleared, only up to logged_before when given (the time the
+    training data was exported). Returns the training status, the mode
+    that ran and whether the prediction logs were cleared.
     """
     mlflow.set_experiment("home_credit_retraining")
     with mlflow.start_run(run_name="auto_retraining"):
         mlflow.log_param("retraining_data", data_path)
         df = pd.read_csv(data_path)
         mlflow.log_param("num_samples", len(df))
-        result = subprocess.run(
-            ["python", "src/models/train.py", "--data", data_path],
-            check=False,
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
+        started = time.perf_counter()
+        success = False
+        if mode == "warm_start":
+            try:
+                result = warm_start_retrain(data_path)
+                mlflow.set_tag("decision", result["decision"])
+                success = True
+            except WarmStartUnavailable as e:
+                print(f"Warm start not possible ({e}), running a full retrain")
+                mode = "full"
+        if mode == "full":
+            success = _full_retrain(data_path)
+        mlflow.log_param("retraining_mode", mode)
+        mlflow.log_metric("retraining_seconds", time.perf_counter() - started)
+
+        if success:
             mlflow.set_tag("training_status", "success")
             print("Retraining completed successfully")
-            if LOG_FILE.exists():
-                LOG_FILE.unlink()
-                print(f"Cleared prediction logs after successful retraining")
+            clear_predictions(before=logged_before)
+            print(f"Cleared prediction logs after successful retraining")
         else:
             mlflow.set_tag("training_status", "failed")
-            print(f"Retraining failed: {result.stderr}")
-        mlflow.set_tag("trigger", "drift_detected")
\ No newline at end of file
+        mlflow.set_tag("trigger", "drift_detected")
+
+    return {
+        "training_status": "success" if success else "failed",
+        "retraining_mode": mode,
+        "logs_cleared": success
+    }
\ No newline at end of file